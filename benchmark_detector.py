@@ -0,0 +1,133 @@
+"""
+Porównanie konfiguracji FaceDetector: czułość (recall) i czas detekcji.
+
+Punktem odniesienia są ramki z dotychczasowej konfiguracji (pełna rozdzielczość,
+bez ograniczeń rozmiaru). Ramka z testowanej konfiguracji jest trafieniem, gdy
+IoU z ramką odniesienia >= --iou.
+
+Przykłady:
+    python benchmark_detector.py --video nagranie.mp4
+    python benchmark_detector.py --images zdjecia/
+    python benchmark_detector.py --camera 0 --frames 300
+    python benchmark_detector.py --images zdjecia/ --backends lbp,ssd,yunet
+"""
+import argparse
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from face_recognition.detector import FaceDetector, face_size_range
+
+
+def load_frames(args):
+    if args.images:
+        paths = sorted(p for p in Path(args.images).iterdir() if p.suffix.lower() in ('.jpg', '.jpeg', '.png'))
+        frames = [cv2.imread(str(p)) for p in paths[:args.frames]]
+        return [f for f in frames if f is not None]
+
+    capture = cv2.VideoCapture(args.video if args.video else args.camera)
+    if args.video is None:
+        capture.set(cv2.CAP_PROP_FRAME_WIDTH, args.width)
+        capture.set(cv2.CAP_PROP_FRAME_HEIGHT, args.height)
+    frames = []
+    while len(frames) < args.frames:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        frames.append(frame)
+    capture.release()
+    return frames
+
+
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+def count_matches(reference, detected, threshold):
+    """Liczba ramek odniesienia, którym odpowiada (zachłannie) ramka wykryta"""
+    used = set()
+    matched = 0
+    for ref in reference:
+        best, best_iou = None, threshold
+        for i, box in enumerate(detected):
+            if i in used:
+                continue
+            value = iou(ref, box)
+            if value >= best_iou:
+                best, best_iou = i, value
+        if best is not None:
+            used.add(best)
+            matched += 1
+    return matched
+
+
+def run(detector, frames):
+    results, latencies = [], []
+    for frame in frames:
+        start = time.perf_counter()
+        faces = detector.detect_faces(frame)
+        latencies.append(time.perf_counter() - start)
+        results.append(faces)
+    return results, np.array(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--video', help='plik wideo')
+    parser.add_argument('--images', help='katalog ze zdjęciami')
+    parser.add_argument('--camera', type=int, default=0)
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--width', type=int, default=800)
+    parser.add_argument('--height', type=int, default=450)
+    parser.add_argument('--iou', type=float, default=0.5)
+    parser.add_argument('--backends', default='', help='dodatkowe backendy, np. lbp,ssd,yunet (modele w models/)')
+    args = parser.parse_args()
+
+    frames = load_frames(args)
+    if not frames:
+        print("Brak klatek do testu")
+        return
+
+    frame_width = frames[0].shape[1]
+    min_face, max_face = face_size_range(frame_width)
+    print(f"{len(frames)} klatek {frame_width}x{frames[0].shape[0]}, rozmiar twarzy {min_face}-{max_face}px")
+
+    configs = [
+        ('pełna rozdzielczość', dict()),
+        ('min/max rozmiar', dict(min_face_size=min_face, max_face_size=max_face)),
+        ('skala 0.75', dict(detection_scale=0.75, min_face_size=min_face, max_face_size=max_face)),
+        ('skala 0.5', dict(detection_scale=0.5, min_face_size=min_face, max_face_size=max_face)),
+        ('skala 0.5 + ROI', dict(detection_scale=0.5, min_face_size=min_face, max_face_size=max_face, tracking=True)),
+    ]
+    for backend in filter(None, args.backends.split(',')):
+        configs.append((backend, dict(backend=backend, min_face_size=min_face, max_face_size=max_face)))
+        configs.append((f'{backend} skala 0.5', dict(backend=backend, detection_scale=0.5,
+                                                    min_face_size=min_face, max_face_size=max_face)))
+
+    reference, _ = run(FaceDetector(), frames)
+    total = sum(len(faces) for faces in reference)
+
+    print(f"{'konfiguracja':<22}{'recall':>8}{'nadmiar':>9}{'śr. ms':>9}{'p95 ms':>9}")
+    for name, options in configs:
+        try:
+            detector = FaceDetector(**options)
+        except (FileNotFoundError, ValueError, cv2.error) as e:
+            print(f"{name:<22}pominięto: {e}")
+            continue
+        results, latencies = run(detector, frames)
+        matched = sum(count_matches(ref, det, args.iou) for ref, det in zip(reference, results))
+        extra = sum(len(det) for det in results) - matched
+        recall = matched / total if total else float('nan')
+        print(f"{name:<22}{recall:>8.3f}{extra:>9d}{latencies.mean():>9.2f}{np.percentile(latencies, 95):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
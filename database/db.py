@@ -1,72 +1,141 @@
+import atexit
+import queue
 import sqlite3
+import threading
+import time
 from pathlib import Path
 
+from metrics.collector import metrics_collector
+
+from .migrations import migrate
+
 DB_PATH = Path(__file__).parent / 'face_access.db'
 
-class Database:
-    def __init__(self):
-        self.conn = sqlite3.connect(DB_PATH)
-        self.create_tables()
-        self.update_tables()
-
-    def create_tables(self):
-        cursor = self.conn.cursor()
-        # Użytkownicy: dodamy kolumnę "role"
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                role TEXT NOT NULL DEFAULT 'USER'
-            )''')
-        # Embeddingi
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Embeddings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                embedding BLOB,
-                FOREIGN KEY(user_id) REFERENCES Users(id)
-            )''')
-        # Logi dostępu
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT,
-                user_id INTEGER,
-                status TEXT,
-                image BLOB,
-                confidence REAL,
-                FOREIGN KEY(user_id) REFERENCES Users(id)
-            )''')
-        # Nieuprawnione próby dostępu
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS UnauthorizedAccess (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                image BLOB NOT NULL,
-                confidence REAL NOT NULL
-            )''')
-        self.conn.commit()
-
-    def update_tables(self):
-        """Aktualizuje strukturę istniejących tabel"""
-        cursor = self.conn.cursor()
+# Domyślne ustawienia połączeń (WAL: czytelnicy nie blokują się z zapisującym)
+DB_SETTINGS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # ms
+}
+
+
+class ConnectionManager:
+    """
+    Współdzielony menedżer połączeń do jednego pliku bazy.
+    Każdy wątek dostaje własne połączenie (sqlite3 nie lubi współdzielenia
+    połączeń między wątkami), migracje są uruchamiane raz na proces.
+    """
+
+    def __init__(self, path, journal_mode='WAL', synchronous='NORMAL', busy_timeout=5000):
+        self.path = path
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.busy_timeout = busy_timeout
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.migrated = False
+        self.batcher = None
+
+    def get(self):
+        """Zwraca połączenie bieżącego wątku, otwierając je przy pierwszym użyciu"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.connect()
+            self.local.conn = conn
+        return conn
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout / 1000)
+        conn.execute(f'PRAGMA journal_mode = {self.journal_mode}')
+        conn.execute(f'PRAGMA synchronous = {self.synchronous}')
+        conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout)}')
+
+        with self.lock:
+            if not self.migrated:
+                # Schemat jest aktualizowany wersjonowanymi migracjami (database/migrations.py)
+                migrate(conn)
+                self.migrated = True
+        return conn
+
+    def get_batcher(self):
+        with self.lock:
+            if self.batcher is None:
+                self.batcher = WriteBatcher(self)
+            return self.batcher
+
+
+class WriteBatcher:
+    """
+    Zapis z opóźnieniem: instrukcje INSERT są kolejkowane i wykonywane przez
+    osobny wątek w jednej transakcji na paczkę (do max_batch instrukcji lub
+    max_delay sekund), zamiast commitu po każdym wierszu.
+    """
+
+    def __init__(self, manager, max_batch=100, max_delay=0.5):
+        self.manager = manager
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name='WriteBatcher', daemon=True)
+        self.thread.start()
+        atexit.register(self.flush)
+
+    def submit(self, sql, params=()):
+        self.queue.put((sql, params))
+
+    def flush(self):
+        """Czeka, aż wszystkie zakolejkowane zapisy trafią do bazy"""
+        self.queue.join()
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            try:
+                while len(batch) < self.max_batch:
+                    batch.append(self.queue.get(timeout=self.max_delay))
+            except queue.Empty:
+                pass
+            self.write(batch)
+            for _ in batch:
+                self.queue.task_done()
+
+    def write(self, batch):
+        conn = self.manager.get()
+        started = time.perf_counter()
         try:
-            # Sprawdź czy kolumny już istnieją
-            cursor.execute('PRAGMA table_info(Logs)')
-            columns = [column[1] for column in cursor.fetchall()]
-            
-            # Dodaj kolumnę image jeśli nie istnieje
-            if 'image' not in columns:
-                cursor.execute('ALTER TABLE Logs ADD COLUMN image BLOB')
-            
-            # Dodaj kolumnę confidence jeśli nie istnieje
-            if 'confidence' not in columns:
-                cursor.execute('ALTER TABLE Logs ADD COLUMN confidence REAL')
-            
-            self.conn.commit()
+            with conn:
+                for sql, params in batch:
+                    conn.execute(sql, params)
+            metrics_collector.log_stage_timings({'db': time.perf_counter() - started})
         except Exception as e:
-            print(f"Error updating tables: {e}")
-            self.conn.rollback()
+            print(f"Error writing batch of {len(batch)} statements: {e}")
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_connection_manager(path=None):
+    """Zwraca współdzielony menedżer połączeń dla danego pliku bazy"""
+    path = Path(path or DB_PATH)
+    with _managers_lock:
+        if path not in _managers:
+            _managers[path] = ConnectionManager(path, **DB_SETTINGS)
+        return _managers[path]
+
+
+class Database:
+    def __init__(self):
+        self.manager = get_connection_manager(DB_PATH)
 
     def get_conn(self):
-        return self.conn
\ No newline at end of file
+        return self.manager.get()
+
+    def write_behind(self, sql, params=()):
+        """Kolejkuje zapis do wykonania w paczce przez WriteBatcher"""
+        self.manager.get_batcher().submit(sql, params)
+
+    def flush(self):
+        """Wymusza zapisanie zakolejkowanych wierszy"""
+        if self.manager.batcher is not None:
+            self.manager.batcher.flush()
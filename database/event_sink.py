@@ -0,0 +1,143 @@
+import atexit
+import queue
+import threading
+import time
+
+import cv2
+
+from metrics.collector import metrics_collector
+
+from .snapshot_store import snapshot_store
+
+# Polityki przepełnienia kolejki
+DROP_OLDEST = 'drop_oldest'   # usuń najstarsze zdarzenie, przyjmij nowe
+DROP_NEWEST = 'drop_newest'   # odrzuć nowe zdarzenie
+BLOCK = 'block'               # czekaj na miejsce (najwyżej block_timeout sekund)
+
+_STOP = object()
+
+
+class EventSink:
+    """
+    Asynchroniczny zapis zdarzeń uwierzytelniania. Wątek GUI tylko wrzuca
+    klatkę do ograniczonej kolejki; kodowanie JPEG, zapis do magazynu
+    snapshotów i INSERT do bazy wykonuje wątek roboczy.
+    Przy zamknięciu programu kolejka jest opróżniana (atexit).
+    """
+
+    def __init__(self, user_model=None, maxsize=32, policy=DROP_OLDEST,
+                 block_timeout=1.0, jpeg_quality=90):
+        if policy not in (DROP_OLDEST, DROP_NEWEST, BLOCK):
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.user_model = user_model
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.jpeg_quality = jpeg_quality
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.thread = None
+        atexit.register(self.close)
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='EventSink', daemon=True)
+                self.thread.start()
+
+    def log_auth_event(self, user_id, frame=None, confidence=None, status='success'):
+        """Kolejkuje wpis do Logs; frame nie może być później modyfikowana przez wywołującego"""
+        return self.submit(('auth', user_id, status, frame, confidence, None))
+
+    def log_unauthorized_access(self, frame, confidence, on_saved=None):
+        """
+        Kolejkuje nieudaną próbę dostępu. on_saved(image_path) jest wywoływane
+        w wątku roboczym po zapisaniu zdjęcia (np. wysłanie powiadomienia).
+        """
+        return self.submit(('unauthorized', None, None, frame, confidence, on_saved))
+
+    def submit(self, item):
+        self.start()
+        try:
+            if self.policy == BLOCK:
+                self.queue.put(item, timeout=self.block_timeout)
+                return True
+            self.queue.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+
+        if self.policy == DROP_OLDEST:
+            try:
+                self.queue.get_nowait()
+                self.queue.task_done()
+                self.dropped += 1
+                self.queue.put_nowait(item)
+                return True
+            except (queue.Empty, queue.Full):
+                pass
+        self.dropped += 1
+        print(f"Event sink queue full, dropped event ({self.dropped} total)")
+        return False
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is _STOP:
+                    return
+                self.write(item)
+            except Exception as e:
+                print(f"Error writing event: {e}")
+            finally:
+                self.queue.task_done()
+
+    def write(self, item):
+        kind, user_id, status, frame, confidence, on_saved = item
+        image_ref = self.store_frame(frame)
+        user_model = self.get_user_model()
+
+        if kind == 'auth':
+            user_model.log_event(user_id, status, confidence=confidence, image_ref=image_ref)
+            return
+
+        # Wpis próby nieautoryzowanej jest zatwierdzany od razu (nie przez WriteBatcher)
+        started = time.perf_counter()
+        user_model.log_unauthorized_access(None, confidence, image_ref=image_ref)
+        metrics_collector.log_stage_timings({'db': time.perf_counter() - started})
+        if on_saved is not None and image_ref is not None:
+            on_saved(str(snapshot_store.path(image_ref)))
+
+    def store_frame(self, frame):
+        if frame is None:
+            return None
+        ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            return None
+        return snapshot_store.put(encoded.tobytes())
+
+    def get_user_model(self):
+        if self.user_model is None:
+            from .models import UserModel
+            self.user_model = UserModel()
+        return self.user_model
+
+    def flush(self):
+        """Czeka na zapisanie wszystkich zakolejkowanych zdarzeń"""
+        if self.thread is not None and self.thread.is_alive():
+            self.queue.join()
+        if self.user_model is not None:
+            self.user_model.db.flush()
+
+    def close(self, timeout=5.0):
+        """Opróżnia kolejkę i zatrzymuje wątek roboczy"""
+        if self.thread is None or not self.thread.is_alive():
+            return
+        self.queue.put(_STOP)
+        self.thread.join(timeout)
+        if self.user_model is not None:
+            self.user_model.db.flush()
+
+
+# Globalna instancja zapisu zdarzeń
+event_sink = EventSink()
@@ -0,0 +1,99 @@
+import threading
+import numpy as np
+
+EMBEDDING_DIM = 512
+
+
+def normalize_rows(matrix):
+    """L2-normalizacja wierszy w miejscu, aby podobieństwo kosinusowe było zwykłym iloczynem skalarnym"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+class GallerySnapshot:
+    """Niezmienny widok galerii: macierz embeddingów (N, 512) i równoległa tablica user_id"""
+
+    def __init__(self, user_ids, embedding_ids, matrix):
+        self.user_ids = user_ids
+        self.embedding_ids = embedding_ids  # Embeddings.id - pozwala indeksom dobudowywać tylko nowe wiersze
+        self.matrix = matrix
+        self._pairs = None
+
+        # Wiersze są posortowane po user_id, więc próbki jednego użytkownika
+        # tworzą ciągły segment - pozwala to liczyć maksimum per użytkownik
+        # przez np.maximum.reduceat zamiast pętli w Pythonie
+        if len(user_ids):
+            starts = np.flatnonzero(np.diff(user_ids)) + 1
+            self.segment_starts = np.concatenate(([0], starts))
+        else:
+            self.segment_starts = np.empty(0, dtype=np.int64)
+        self.unique_ids = user_ids[self.segment_starts]
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def as_pairs(self):
+        """Zwraca listę (user_id, embedding) w formacie dawnego get_all_embeddings()"""
+        if self._pairs is None:
+            self._pairs = list(zip(self.user_ids.tolist(), self.matrix))
+        return self._pairs
+
+    def with_row(self, user_id, embedding_id, embedding):
+        """Zwraca nowy snapshot z dodanym wierszem, zachowując sortowanie po user_id"""
+        row = normalize_rows(np.asarray(embedding, dtype=np.float32).reshape(1, EMBEDDING_DIM).copy())
+        pos = int(np.searchsorted(self.user_ids, user_id, side='right'))
+        return GallerySnapshot(
+            np.insert(self.user_ids, pos, user_id),
+            np.insert(self.embedding_ids, pos, embedding_id),
+            np.insert(self.matrix, pos, row, axis=0)
+        )
+
+
+class EmbeddingGallery:
+    """Cache galerii embeddingów współdzielony przez wszystkie instancje UserModel"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._snapshot = None
+
+    def get(self, conn):
+        """Zwraca aktualny snapshot, ładując go z bazy tylko po unieważnieniu"""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+
+        with self.lock:
+            if self._snapshot is None:
+                self._snapshot = self._load(conn)
+            return self._snapshot
+
+    def append(self, user_id, embedding_id, embedding):
+        """Dopisuje nowy embedding do załadowanego snapshotu bez ponownego odczytu tabeli"""
+        with self.lock:
+            if self._snapshot is not None:
+                self._snapshot = self._snapshot.with_row(user_id, embedding_id, embedding)
+
+    def invalidate(self):
+        """Unieważnia cache - wywoływane po usunięciu wierszy z tabeli Embeddings"""
+        with self.lock:
+            self._snapshot = None
+
+    def _load(self, conn):
+        cursor = conn.cursor()
+        cursor.execute('SELECT id, user_id, embedding FROM Embeddings ORDER BY user_id, id')
+        rows = cursor.fetchall()
+
+        user_ids = np.empty(len(rows), dtype=np.int64)
+        embedding_ids = np.empty(len(rows), dtype=np.int64)
+        matrix = np.empty((len(rows), EMBEDDING_DIM), dtype=np.float32)
+        for i, (embedding_id, user_id, emb_blob) in enumerate(rows):
+            embedding_ids[i] = embedding_id
+            user_ids[i] = user_id
+            matrix[i] = np.frombuffer(emb_blob, dtype=np.float32)
+
+        return GallerySnapshot(user_ids, embedding_ids, normalize_rows(matrix))
+
+
+# Globalna instancja cache galerii
+embedding_gallery = EmbeddingGallery()
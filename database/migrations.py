@@ -0,0 +1,168 @@
+"""
+Wersjonowane migracje schematu bazy.
+
+Aktualna wersja schematu jest zapisana w PRAGMA user_version. Każda migracja
+jest uruchamiana dokładnie raz, w kolejności numerów. Migracje są napisane tak,
+aby działały również na bazach utworzonych przed wprowadzeniem wersjonowania
+(user_version = 0, ale tabele już istnieją).
+"""
+from .snapshot_store import snapshot_store
+
+
+def table_columns(cursor, table):
+    cursor.execute(f'PRAGMA table_info({table})')
+    return [column[1] for column in cursor.fetchall()]
+
+
+def migration_1_base_schema(conn):
+    cursor = conn.cursor()
+    # Użytkownicy: dodamy kolumnę "role"
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS Users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            role TEXT NOT NULL DEFAULT 'USER'
+        )''')
+    # Embeddingi
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS Embeddings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            embedding BLOB,
+            FOREIGN KEY(user_id) REFERENCES Users(id)
+        )''')
+    # Logi dostępu
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS Logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT,
+            user_id INTEGER,
+            status TEXT,
+            image BLOB,
+            confidence REAL,
+            FOREIGN KEY(user_id) REFERENCES Users(id)
+        )''')
+    # Nieuprawnione próby dostępu
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS UnauthorizedAccess (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            image BLOB NOT NULL,
+            confidence REAL NOT NULL
+        )''')
+
+
+def migration_2_logs_image_confidence(conn):
+    cursor = conn.cursor()
+    columns = table_columns(cursor, 'Logs')
+
+    # Dodaj kolumnę image jeśli nie istnieje
+    if 'image' not in columns:
+        cursor.execute('ALTER TABLE Logs ADD COLUMN image BLOB')
+
+    # Dodaj kolumnę confidence jeśli nie istnieje
+    if 'confidence' not in columns:
+        cursor.execute('ALTER TABLE Logs ADD COLUMN confidence REAL')
+
+
+def migration_3_snapshot_refs(conn, batch_size=50):
+    cursor = conn.cursor()
+
+    # Referencja do zdjęcia w magazynie snapshotów zamiast BLOB-a w wierszu
+    if 'image_ref' not in table_columns(cursor, 'Logs'):
+        cursor.execute('ALTER TABLE Logs ADD COLUMN image_ref TEXT')
+
+    if 'image_ref' not in table_columns(cursor, 'UnauthorizedAccess'):
+        # Kolumna image była NOT NULL - SQLite nie pozwala zmienić ograniczenia,
+        # więc tabela jest przebudowywana
+        cursor.execute('''
+            CREATE TABLE UnauthorizedAccess_new (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                image BLOB,
+                image_ref TEXT,
+                confidence REAL NOT NULL
+            )''')
+        cursor.execute('''
+            INSERT INTO UnauthorizedAccess_new(id, timestamp, image, confidence)
+            SELECT id, timestamp, image, confidence FROM UnauthorizedAccess''')
+        cursor.execute('DROP TABLE UnauthorizedAccess')
+        cursor.execute('ALTER TABLE UnauthorizedAccess_new RENAME TO UnauthorizedAccess')
+    conn.commit()
+
+    # Przenieś zdjęcia zapisane inline (BLOB) do magazynu snapshotów
+    moved = 0
+    for table in ('Logs', 'UnauthorizedAccess'):
+        while True:
+            cursor.execute(f'SELECT id, image FROM {table} WHERE image IS NOT NULL LIMIT ?', (batch_size,))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            for row_id, image in rows:
+                ref = snapshot_store.put(bytes(image))
+                cursor.execute(f'UPDATE {table} SET image_ref = ?, image = NULL WHERE id = ?', (ref, row_id))
+            conn.commit()
+            moved += len(rows)
+
+    # Odzyskaj miejsce po usuniętych BLOB-ach
+    return moved > 0
+
+
+def migration_4_indexes(conn):
+    cursor = conn.cursor()
+    # get_access_logs / get_access_logs_page: WHERE status = ? ORDER BY timestamp DESC, id DESC
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_status_timestamp ON Logs(status, timestamp, id)')
+    # get_unauthorized_attempts: ORDER BY timestamp DESC
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_unauthorized_timestamp ON UnauthorizedAccess(timestamp)')
+    # get_all_users (JOIN po user_id), ładowanie galerii (ORDER BY user_id, id), delete_user
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_embeddings_user_id ON Embeddings(user_id, id)')
+    # admin_exists: WHERE role = 'ADMIN'
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_role ON Users(role)')
+    cursor.execute('ANALYZE')
+
+
+def migration_5_image_ref_indexes(conn):
+    cursor = conn.cursor()
+    # snapshot_referenced: WHERE image_ref = ? (usuwanie wpisów ze zdjęciem)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_image_ref ON Logs(image_ref)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_unauthorized_image_ref ON UnauthorizedAccess(image_ref)')
+
+
+# (wersja, opis, funkcja) - nowe migracje dopisujemy wyłącznie na końcu listy
+MIGRATIONS = [
+    (1, 'base schema', migration_1_base_schema),
+    (2, 'Logs.image and Logs.confidence', migration_2_logs_image_confidence),
+    (3, 'snapshot store references', migration_3_snapshot_refs),
+    (4, 'secondary indexes', migration_4_indexes),
+    (5, 'image_ref indexes', migration_5_image_ref_indexes),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn):
+    """Uruchamia brakujące migracje; zwraca końcową wersję schematu"""
+    version = get_schema_version(conn)
+    needs_vacuum = False
+
+    for target, name, migration in MIGRATIONS:
+        if target <= version:
+            continue
+        try:
+            if migration(conn):
+                needs_vacuum = True
+            conn.execute(f'PRAGMA user_version = {target}')
+            conn.commit()
+            version = target
+        except Exception as e:
+            print(f"Error applying migration {target} ({name}): {e}")
+            conn.rollback()
+            raise
+
+    if needs_vacuum:
+        conn.execute('VACUUM')
+    return version
@@ -1,6 +1,8 @@
 import sqlite3
-import numpy as np
 from .db import Database
+from .gallery import embedding_gallery
+from .snapshot_store import snapshot_store
+from .user_cache import user_cache
 
 class UserModel:
     def __init__(self):
@@ -14,6 +16,8 @@ class UserModel:
         emb_bytes = embedding.tobytes()
         cursor.execute('INSERT INTO Embeddings(user_id, embedding) VALUES(?,?)', (user_id, emb_bytes))
         conn.commit()
+        embedding_gallery.append(user_id, cursor.lastrowid, embedding)
+        user_cache.put((user_id, name, role))
         return user_id
 
     def add_embedding(self, user_id, embedding):
@@ -25,6 +29,7 @@ class UserModel:
             (user_id, emb_bytes)
         )
         conn.commit()
+        embedding_gallery.append(user_id, cursor.lastrowid, embedding)
 
     def delete_user(self, user_id):
         conn = self.db.get_conn()
@@ -33,68 +38,64 @@ class UserModel:
             cursor.execute('DELETE FROM Embeddings WHERE user_id = ?', (user_id,))
             cursor.execute('DELETE FROM Users WHERE id = ?', (user_id,))
             conn.commit()
+            embedding_gallery.invalidate()
+            user_cache.invalidate(user_id)
             return True
         except Exception as e:
             print(f"Error deleting user: {e}")
             conn.rollback()
             return False
 
+    def get_gallery(self):
+        """Zwraca galerię embeddingów z cache (macierz float32 + tablica user_id)"""
+        return embedding_gallery.get(self.db.get_conn())
+
     def get_all_embeddings(self):
-        conn = self.db.get_conn()
-        cursor = conn.cursor()
-        cursor.execute('SELECT user_id, embedding FROM Embeddings')
-        results = []
-        for user_id, emb_blob in cursor.fetchall():
-            emb = np.frombuffer(emb_blob, dtype=np.float32)
-            results.append((user_id, emb))
-        return results
+        return self.get_gallery().as_pairs()
 
     def get_user(self, user_id):
+        """Zwraca (id, name, role) lub None; odczyt z cache user_cache"""
         if user_id is None:
-            print("Warning: user_id is None!")
             return None
 
         try:
             user_id = int(user_id)
         except (ValueError, TypeError):
-            print(f"Warning: user_id '{user_id}' is not a valid integer!")
-
-        conn = self.db.get_conn()
-        cursor = conn.cursor()
+            return None
 
-        cursor.execute('SELECT COUNT(*) FROM Users WHERE id=?', (user_id,))
-        count = cursor.fetchone()[0]
-        print(f"Found {count} users with id={user_id}")
+        return user_cache.get(self.db.get_conn(), user_id)
 
-        cursor.execute('SELECT id, name, role FROM Users WHERE id=?', (user_id,))
-        result = cursor.fetchone()
-        return result
+    def get_users(self, user_ids):
+        """Zwraca słownik id -> (id, name, role) dla wielu użytkowników naraz"""
+        return user_cache.get_many(self.db.get_conn(), {int(user_id) for user_id in user_ids if user_id is not None})
 
-    def log_event(self, user_id, status, image=None, confidence=None):
+    def log_event(self, user_id, status, image=None, confidence=None, image_ref=None):
+        """
+        Zapisuje zdarzenie; zdjęcie (bajty JPEG) trafia do magazynu snapshotów.
+        Wiersz jest zapisywany z opóźnieniem, w paczce z innymi logami (WriteBatcher).
+        image_ref: referencja zdjęcia już zapisanego w magazynie (zamiast image).
+        """
         from datetime import datetime
-        conn = self.db.get_conn()
-        cursor = conn.cursor()
-        
         try:
             if confidence is not None:
                 confidence = float(confidence)
-                
-            cursor.execute(
-                'INSERT INTO Logs(timestamp, user_id, status, image, confidence) VALUES(?,?,?,?,?)',
-                (datetime.now().isoformat(), user_id, status, image, confidence)
+
+            if image_ref is None:
+                image_ref = snapshot_store.put(image)
+            self.db.write_behind(
+                'INSERT INTO Logs(timestamp, user_id, status, image_ref, confidence) VALUES(?,?,?,?,?)',
+                (datetime.now().isoformat(), user_id, status, image_ref, confidence)
             )
-            conn.commit()
             return True
         except Exception as e:
             print(f"Error logging event: {e}")
-            conn.rollback()
             return False
 
     def get_access_logs(self, limit=100):
         conn = self.db.get_conn()
         cursor = conn.cursor()
         cursor.execute('''
-            SELECT l.id, l.timestamp, l.user_id, u.name, l.status, l.image, l.confidence
+            SELECT l.id, l.timestamp, l.user_id, u.name, l.status, l.image_ref, l.confidence
             FROM Logs l
             JOIN Users u ON l.user_id = u.id
             WHERE l.status = 'success'
@@ -103,6 +104,38 @@ class UserModel:
         ''', (limit,))
         return cursor.fetchall()
 
+    def get_access_logs_page(self, before=None, limit=200):
+        """
+        Pobiera stronę logów stronicowaniem po kluczu (timestamp, id), malejąco.
+        before: (timestamp, id) ostatniego wiersza poprzedniej strony lub None.
+        """
+        conn = self.db.get_conn()
+        cursor = conn.cursor()
+        query = '''
+            SELECT l.id, l.timestamp, l.user_id, u.name, l.status, l.image_ref, l.confidence
+            FROM Logs l
+            JOIN Users u ON l.user_id = u.id
+            WHERE l.status = 'success'
+        '''
+        params = []
+        if before is not None:
+            query += ' AND (l.timestamp, l.id) < (?, ?)'
+            params.extend(before)
+        query += ' ORDER BY l.timestamp DESC, l.id DESC LIMIT ?'
+        params.append(limit)
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+    def iter_access_logs(self, page_size=500):
+        """Iteruje po wszystkich logach stronami, bez ładowania całej tabeli naraz"""
+        before = None
+        while True:
+            page = self.get_access_logs_page(before, page_size)
+            yield from page
+            if len(page) < page_size:
+                return
+            before = (page[-1][1], page[-1][0])
+
     def admin_exists(self):
         conn = self.db.get_conn()
         cursor = conn.cursor()
@@ -119,7 +152,7 @@ class UserModel:
             SELECT u.id, u.name, u.role, COUNT(e.id) as embedding_count
             FROM Users u
             LEFT JOIN Embeddings e ON u.id = e.user_id
-            GROUP BY u.id, u.name, u.role
+            GROUP BY u.id
             ORDER BY u.id
         ''')
 
@@ -141,15 +174,17 @@ class UserModel:
                 cursor.execute('UPDATE Users SET role=? WHERE id=?', (role, user_id))
 
             conn.commit()
+            user_cache.invalidate(user_id)
             return cursor.rowcount > 0
         except Exception as e:
             print(f"Error updating user: {e}")
             conn.rollback()
             return False
 
-    def log_unauthorized_access(self, image_bytes, confidence):
+    def log_unauthorized_access(self, image_bytes, confidence, image_ref=None):
         """
         Zapisuje nieudaną próbę dostępu wraz ze zdjęciem.
+        image_ref: referencja zdjęcia już zapisanego w magazynie (zamiast image_bytes).
         """
         from datetime import datetime
         conn = self.db.get_conn()
@@ -157,9 +192,11 @@ class UserModel:
         try:
             # Ensure confidence is a float
             confidence = float(confidence)
+            if image_ref is None:
+                image_ref = snapshot_store.put(image_bytes)
             cursor.execute(
-                'INSERT INTO UnauthorizedAccess(timestamp, image, confidence) VALUES(?, ?, ?)',
-                (datetime.now().isoformat(), image_bytes, confidence)
+                'INSERT INTO UnauthorizedAccess(timestamp, image_ref, confidence) VALUES(?, ?, ?)',
+                (datetime.now().isoformat(), image_ref, confidence)
             )
             conn.commit()
             return True
@@ -171,12 +208,13 @@ class UserModel:
     def get_unauthorized_attempts(self, limit=100):
         """
         Pobiera listę nieuprawnionych prób dostępu.
-        Zwraca listę krotek (id, timestamp, image_bytes, confidence)
+        Zwraca listę krotek (id, timestamp, image_ref, confidence);
+        zdjęcie odczytuje się przez snapshot_store.load(image_ref)
         """
         conn = self.db.get_conn()
         cursor = conn.cursor()
         cursor.execute(
-            'SELECT id, timestamp, image, confidence FROM UnauthorizedAccess ORDER BY timestamp DESC LIMIT ?',
+            'SELECT id, timestamp, image_ref, confidence FROM UnauthorizedAccess ORDER BY timestamp DESC LIMIT ?',
             (limit,)
         )
         return cursor.fetchall()
@@ -188,8 +226,13 @@ class UserModel:
         conn = self.db.get_conn()
         cursor = conn.cursor()
         try:
+            cursor.execute('SELECT image_ref FROM UnauthorizedAccess WHERE id = ?', (attempt_id,))
+            row = cursor.fetchone()
             cursor.execute('DELETE FROM UnauthorizedAccess WHERE id = ?', (attempt_id,))
             conn.commit()
+            # Zdjęcie jest usuwane, jeśli nie odwołuje się do niego żaden inny wpis
+            if row and row[0] and not self.snapshot_referenced(row[0]):
+                snapshot_store.delete(row[0])
             return True
         except Exception as e:
             print(f"Error deleting unauthorized attempt: {e}")
@@ -200,13 +243,43 @@ class UserModel:
         """
         Tymczasowa metoda do wyczyszczenia tabeli logów.
         """
+        self.db.flush()
         conn = self.db.get_conn()
         cursor = conn.cursor()
         try:
             cursor.execute('DELETE FROM Logs')
             conn.commit()
-            return True
         except Exception as e:
             print(f"Error clearing logs: {e}")
             conn.rollback()
-            return False
\ No newline at end of file
+            return False
+
+        removed = self.collect_snapshot_garbage()
+        if removed:
+            print(f"Usunięto {removed} nieużywanych zdjęć")
+        return True
+
+    def snapshot_referenced(self, image_ref):
+        """Czy jakikolwiek wpis w Logs lub UnauthorizedAccess odwołuje się do zdjęcia"""
+        self.db.flush()
+        cursor = self.db.get_conn().cursor()
+        cursor.execute('''
+            SELECT EXISTS(SELECT 1 FROM Logs WHERE image_ref = ?)
+                OR EXISTS(SELECT 1 FROM UnauthorizedAccess WHERE image_ref = ?)
+        ''', (image_ref, image_ref))
+        return bool(cursor.fetchone()[0])
+
+    def referenced_snapshots(self):
+        """Skróty zdjęć, do których odwołują się Logs i UnauthorizedAccess"""
+        cursor = self.db.get_conn().cursor()
+        cursor.execute('''
+            SELECT image_ref FROM Logs WHERE image_ref IS NOT NULL
+            UNION
+            SELECT image_ref FROM UnauthorizedAccess WHERE image_ref IS NOT NULL
+        ''')
+        return {row[0] for row in cursor.fetchall()}
+
+    def collect_snapshot_garbage(self, grace_period=60.0):
+        """Usuwa z magazynu zdjęcia, do których nie odwołuje się żaden wpis"""
+        self.db.flush()
+        return snapshot_store.collect_garbage(self.referenced_snapshots(), grace_period)
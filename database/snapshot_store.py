@@ -0,0 +1,133 @@
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+SNAPSHOT_DIR = Path(__file__).parent / 'snapshots'
+
+
+class SnapshotStore:
+    """
+    Magazyn zdjęć adresowany treścią. Plik JPEG jest zapisywany pod nazwą
+    równą jego skrótowi SHA-256 w katalogach dzielonych po dwóch pierwszych
+    bajtach skrótu (ab/cd/abcd...jpg); w bazie przechowywany jest tylko skrót.
+    Razem ze zdjęciem zapisywana jest miniatura o stałej wysokości.
+    """
+
+    def __init__(self, root=SNAPSHOT_DIR, thumb_height=120, thumb_quality=80):
+        self.root = Path(root)
+        self.thumb_height = thumb_height
+        self.thumb_quality = thumb_quality
+
+    def path(self, ref):
+        return self.root / ref[:2] / ref[2:4] / f"{ref}.jpg"
+
+    def thumbnail_path(self, ref):
+        return self.root / ref[:2] / ref[2:4] / f"{ref}_thumb.jpg"
+
+    def put(self, jpeg_bytes):
+        """Zapisuje zdjęcie (jeśli jeszcze go nie ma) i zwraca jego referencję"""
+        if not jpeg_bytes:
+            return None
+        ref = hashlib.sha256(jpeg_bytes).hexdigest()
+        path = self.path(ref)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._write_atomic(path, jpeg_bytes)
+        if not self.thumbnail_path(ref).exists():
+            self._write_thumbnail(ref, jpeg_bytes)
+        return ref
+
+    def load(self, ref):
+        """Zwraca bajty pełnego zdjęcia lub None"""
+        if not ref:
+            return None
+        try:
+            return self.path(ref).read_bytes()
+        except OSError:
+            return None
+
+    def load_thumbnail(self, ref):
+        """
+        Zwraca bajty miniatury lub None. Brakująca miniatura (np. po ręcznym
+        usunięciu) jest generowana przy pierwszym odczycie i zapisywana na dysk.
+        """
+        if not ref:
+            return None
+        try:
+            return self.thumbnail_path(ref).read_bytes()
+        except OSError:
+            pass
+
+        jpeg_bytes = self.load(ref)
+        if jpeg_bytes is None:
+            return None
+        self._write_thumbnail(ref, jpeg_bytes)
+        try:
+            return self.thumbnail_path(ref).read_bytes()
+        except OSError:
+            return None
+
+    def delete(self, ref):
+        """Usuwa zdjęcie i jego miniaturę"""
+        for path in (self.path(ref), self.thumbnail_path(ref)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def collect_garbage(self, referenced, grace_period=60.0):
+        """
+        Usuwa zdjęcia (i miniatury), których skrótu nie ma w referenced.
+        Pliki młodsze niż grace_period sekund są pomijane - mogą należeć do
+        zdarzenia, którego wiersz nie trafił jeszcze do bazy. Zwraca liczbę
+        usuniętych zdjęć.
+        """
+        if not self.root.exists():
+            return 0
+        cutoff = time.time() - grace_period
+        removed = set()
+        for path in self.root.glob('*/*/*'):
+            ref = path.name.split('.')[0].split('_')[0]
+            if ref in referenced:
+                continue
+            try:
+                if path.stat().st_mtime > cutoff:
+                    continue
+                path.unlink()
+            except OSError:
+                continue
+            if not path.name.endswith('.tmp'):
+                removed.add(ref)
+        for directory in sorted(self.root.glob('*/*'), reverse=True) + sorted(self.root.glob('*')):
+            try:
+                directory.rmdir()  # tylko puste katalogi
+            except OSError:
+                pass
+        return len(removed)
+
+    def _write_thumbnail(self, ref, jpeg_bytes):
+        img = cv2.imdecode(np.frombuffer(jpeg_bytes, np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            return
+        h, w = img.shape[:2]
+        target_width = max(1, int(self.thumb_height * w / h))
+        thumb = cv2.resize(img, (target_width, self.thumb_height), interpolation=cv2.INTER_AREA)
+        ok, encoded = cv2.imencode('.jpg', thumb, [cv2.IMWRITE_JPEG_QUALITY, self.thumb_quality])
+        if ok:
+            self._write_atomic(self.thumbnail_path(ref), encoded.tobytes())
+
+    @staticmethod
+    def _write_atomic(path, data):
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+
+# Globalna instancja magazynu zdjęć
+snapshot_store = SnapshotStore()
@@ -0,0 +1,72 @@
+import threading
+
+
+class UserCache:
+    """
+    Cache rekordów użytkowników id -> (id, name, role) współdzielony przez
+    wszystkie instancje UserModel. Tabela Users jest mała, więc przy pierwszym
+    użyciu ładowana jest w całości; zmiany przez UserModel unieważniają wpisy.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._users = None
+
+    def get(self, conn, user_id):
+        """Zwraca (id, name, role) lub None, bez zapytania do bazy po załadowaniu cache"""
+        users = self._users
+        if users is None:
+            users = self._ensure_loaded(conn)
+        user = users.get(user_id)
+        if user is None:
+            user = self._load_one(conn, user_id)
+        return user
+
+    def get_many(self, conn, user_ids):
+        """Zwraca słownik id -> (id, name, role) dla istniejących użytkowników"""
+        users = self._users
+        if users is None:
+            users = self._ensure_loaded(conn)
+        result = {}
+        for user_id in user_ids:
+            user = users.get(user_id)
+            if user is None:
+                user = self._load_one(conn, user_id)
+            if user is not None:
+                result[user_id] = user
+        return result
+
+    def put(self, user):
+        with self.lock:
+            if self._users is not None:
+                self._users = {**self._users, user[0]: user}
+
+    def invalidate(self, user_id=None):
+        """Usuwa jeden wpis albo (bez argumentu) cały cache"""
+        with self.lock:
+            if user_id is None or self._users is None:
+                self._users = None
+            else:
+                users = dict(self._users)
+                users.pop(user_id, None)
+                self._users = users
+
+    def _ensure_loaded(self, conn):
+        with self.lock:
+            if self._users is None:
+                cursor = conn.cursor()
+                cursor.execute('SELECT id, name, role FROM Users')
+                self._users = {row[0]: row for row in cursor.fetchall()}
+            return self._users
+
+    def _load_one(self, conn, user_id):
+        cursor = conn.cursor()
+        cursor.execute('SELECT id, name, role FROM Users WHERE id=?', (user_id,))
+        user = cursor.fetchone()
+        if user is not None:
+            self.put(user)
+        return user
+
+
+# Globalna instancja cache użytkowników
+user_cache = UserCache()
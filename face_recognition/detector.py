@@ -1,22 +1,200 @@
-import cv2
+import json
+import math
+import time
 from pathlib import Path
 
 import cv2
-CASCADE_PATH = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+import numpy as np
+
+from face_recognition.detector_backends import create_backend
+
+DETECTOR_SETTINGS_PATH = Path("config/detector_settings.json")
+
+# Parametry instalacji przy drzwiach używane do wyznaczenia rozmiaru twarzy
+CAMERA_HFOV_DEG = 60.0        # poziome pole widzenia kamery
+FACE_WIDTH_M = 0.16           # typowa szerokość twarzy
+DOOR_DISTANCE_M = (0.4, 2.0)  # oczekiwana odległość osoby od kamery (min, max)
+
+
+def face_size_range(frame_width, distance=DOOR_DISTANCE_M, hfov_deg=CAMERA_HFOV_DEG, face_width=FACE_WIDTH_M):
+    """
+    Zwraca (min_face_size, max_face_size) w pikselach pełnej klatki dla twarzy
+    oddalonej o distance = (min_m, max_m) metrów (model kamery otworkowej).
+    """
+    focal_px = frame_width / (2 * math.tan(math.radians(hfov_deg) / 2))
+    near, far = distance
+    return int(focal_px * face_width / far), int(focal_px * face_width / near)
+
+
+# Argumenty FaceDetector niezależne od backendu
+FACE_DETECTOR_OPTIONS = (
+    'backend', 'tracking', 'redetect_interval', 'roi_margin', 'roi_size_range',
+    'detection_scale', 'min_face_size', 'max_face_size', 'auto_face_size'
+)
+
+
+def load_detector_settings(path=DETECTOR_SETTINGS_PATH):
+    """
+    Wczytuje opcjonalne ustawienia detektora dla danego kontrolera drzwi, np.
+    {"backend": "yunet", "conf_threshold": 0.7, "detection_scale": 0.5}
+    """
+    if not path.exists():
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading detector settings: {e}")
+        return {}
+
+
+def create_detector(**defaults):
+    """
+    Tworzy FaceDetector z ustawieniami domyślnymi nadpisanymi przez plik
+    config/detector_settings.json. Gdy wybrany backend nie może wczytać
+    modelu, używana jest kaskada Haara.
+    """
+    options = {**defaults, **load_detector_settings()}
+    try:
+        return FaceDetector(**options)
+    except (FileNotFoundError, ValueError, cv2.error) as e:
+        print(f"Error creating '{options.get('backend')}' face detector, falling back to haar: {e}")
+        options['backend'] = 'haar'
+        return FaceDetector(**{k: v for k, v in options.items() if k in FACE_DETECTOR_OPTIONS})
+
 
 class FaceDetector:
-    def __init__(self):
-        self.detector = cv2.CascadeClassifier(CASCADE_PATH)
+    """
+    Detektor twarzy z wymiennym backendem (haar, lbp, ssd, yunet - patrz
+    detector_backends.py); pozostałe argumenty trafiają do konstruktora backendu.
+    W trybie tracking=True po udanej detekcji kolejne klatki są przeszukiwane
+    tylko w powiększonym obszarze (ROI) wokół ostatnich ramek, z zawężonym
+    zakresem rozmiarów. Pełna detekcja na całej klatce jest wykonywana co
+    redetect_interval klatek albo gdy twarz zniknie z któregoś ROI.
+
+    detection_scale < 1 - pełna detekcja działa na pomniejszonej klatce,
+    a ramki są przeliczane z powrotem do rozdzielczości oryginału.
+    min_face_size / max_face_size - rozmiar twarzy w pikselach pełnej klatki
+    (patrz face_size_range).
+    auto_face_size=True - gdy rozmiary nie są podane, są wyznaczane przez
+    face_size_range z szerokości klatek faktycznie dostarczanych przez kamerę
+    (kamery często ignorują żądaną rozdzielczość).
+    """
+
+    def __init__(self, backend='haar', tracking=False, redetect_interval=15, roi_margin=0.5,
+                 roi_size_range=(0.7, 1.4), detection_scale=1.0, min_face_size=None, max_face_size=None,
+                 auto_face_size=False, **backend_options):
+        self.backend = create_backend(backend, **backend_options)
         self.current_frame = None
+        self.last_timings = {}
+        self.last_scores = np.empty(0, dtype=np.float32)
+
+        self.detection_scale = detection_scale
+        self.min_face_size = min_face_size
+        self.max_face_size = max_face_size
+        # Rozmiary podane jawnie (np. w config/detector_settings.json) mają pierwszeństwo
+        self.auto_face_size = auto_face_size and min_face_size is None and max_face_size is None
+        self.frame_width = None
+
+        self.tracking = tracking
+        self.redetect_interval = redetect_interval
+        self.roi_margin = roi_margin
+        self.roi_size_range = roi_size_range
+        self.tracked_boxes = None
+        self.frames_since_full = 0
 
     def detect_faces(self, frame):
-        self.current_frame = frame  # Store the current frame
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = self.detector.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5)
+        """Zwraca ramki (N, 4) (x, y, w, h); wyniki pewności są w self.last_scores"""
+        faces, _ = self.detect(frame)
         return faces
 
+    def detect(self, frame):
+        """Zwraca (boxes, scores) dla klatki BGR; czasy etapów (s) są w self.last_timings"""
+        self.current_frame = frame  # Store the current frame
+        if self.auto_face_size and frame.shape[1] != self.frame_width:
+            self.set_frame_width(frame.shape[1])
+
+        # Kaskady pracują na skali szarości - konwersja raz na klatkę, przed skalowaniem i ROI
+        started = time.perf_counter()
+        if self.backend.grayscale and frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        converted = time.perf_counter()
+
+        result = self.locate(frame)
+        self.last_timings = {'gray': converted - started, 'detect': time.perf_counter() - converted}
+        return result
+
+    def locate(self, frame):
+        if self.tracking and self.tracked_boxes is not None and self.frames_since_full < self.redetect_interval:
+            result = self.track_faces(frame)
+            if result is not None:
+                self.frames_since_full += 1
+                self.tracked_boxes, self.last_scores = result
+                return result
+
+        faces, scores = self.detect_full(frame)
+        self.frames_since_full = 0
+        self.tracked_boxes = faces if len(faces) > 0 else None
+        self.last_scores = scores
+        return faces, scores
+
+    def detect_full(self, frame):
+        scale = self.detection_scale
+        if scale != 1.0:
+            frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+        min_size = self.scaled_size(self.min_face_size, scale)
+        max_size = self.scaled_size(self.max_face_size, scale)
+        faces, scores = self.backend.detect(frame, min_size, max_size)
+        if scale != 1.0 and len(faces) > 0:
+            faces = np.round(faces / scale).astype(np.int32)
+        return faces, scores
+
+    @staticmethod
+    def scaled_size(size, scale):
+        if not size:
+            return (0, 0)
+        return (int(size * scale), int(size * scale))
+
+    def track_faces(self, frame):
+        """Szuka każdej śledzonej twarzy w jej ROI; None gdy którakolwiek zginęła"""
+        frame_h, frame_w = frame.shape[:2]
+        min_scale, max_scale = self.roi_size_range
+        found, found_scores = [], []
+
+        for x, y, w, h in self.tracked_boxes:
+            mx, my = int(w * self.roi_margin), int(h * self.roi_margin)
+            x0, y0 = max(0, x - mx), max(0, y - my)
+            x1, y1 = min(frame_w, x + w + mx), min(frame_h, y + h + my)
+
+            candidates, scores = self.backend.detect(
+                frame[y0:y1, x0:x1],
+                min_size=(int(w * min_scale), int(h * min_scale)),
+                max_size=(int(w * max_scale), int(h * max_scale))
+            )
+            if len(candidates) == 0:
+                return None
+
+            # Najbliższy środkiem do poprzedniej pozycji
+            centers = candidates[:, :2] + candidates[:, 2:] / 2 + (x0, y0)
+            best = np.argmin(np.sum((centers - (x + w / 2, y + h / 2)) ** 2, axis=1))
+            found.append(candidates[best] + (x0, y0, 0, 0))
+            found_scores.append(scores[best])
+
+        return np.array(found, dtype=np.int32), np.array(found_scores, dtype=np.float32)
+
+    def set_frame_width(self, frame_width):
+        """Wyznacza min/max rozmiar twarzy dla klatek o szerokości frame_width"""
+        self.frame_width = frame_width
+        self.min_face_size, self.max_face_size = face_size_range(frame_width)
+
+    def reset_tracking(self):
+        """Wymusza pełną detekcję przy następnej klatce"""
+        self.tracked_boxes = None
+        self.frames_since_full = 0
+
     def get_current_frame(self):
         """Returns the current frame and success flag"""
         if self.current_frame is None:
             return False, None
-        return True, self.current_frame.copy()
\ No newline at end of file
+        return True, self.current_frame.copy()
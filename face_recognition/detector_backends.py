@@ -0,0 +1,130 @@
+"""
+Backendy detekcji twarzy używane przez FaceDetector.
+
+Każdy backend przyjmuje klatkę BGR i zwraca (boxes, scores):
+boxes - tablica int32 (N, 4) w formacie (x, y, w, h), scores - float32 (N,).
+Skala wyników zależy od backendu (kaskady: wagi etapów, DNN: prawdopodobieństwo),
+więc porównywać je można tylko w obrębie jednego backendu.
+Pliki modeli są ładowane z lokalnego katalogu MODELS_DIR.
+"""
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+MODELS_DIR = Path("models")
+HAAR_CASCADE_PATH = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+
+
+def empty_result():
+    return np.empty((0, 4), dtype=np.int32), np.empty(0, dtype=np.float32)
+
+
+def filter_by_size(boxes, scores, min_size=(0, 0), max_size=(0, 0)):
+    """Odrzuca ramki spoza zakresu rozmiarów (dla backendów bez minSize/maxSize)"""
+    keep = (boxes[:, 2] >= min_size[0]) & (boxes[:, 3] >= min_size[1])
+    if max_size[0] and max_size[1]:
+        keep &= (boxes[:, 2] <= max_size[0]) & (boxes[:, 3] <= max_size[1])
+    return boxes[keep], scores[keep]
+
+
+def model_path(filename, models_dir=MODELS_DIR):
+    path = Path(models_dir) / filename
+    if not path.exists():
+        raise FileNotFoundError(f"Brak pliku modelu detektora: {path}")
+    return str(path)
+
+
+class CascadeBackend:
+    """Kaskada Haara (domyślna, dołączona do OpenCV)"""
+
+    grayscale = True  # przyjmuje klatki w skali szarości (konwersję robi FaceDetector)
+
+    def __init__(self, cascade_path=HAAR_CASCADE_PATH, scale_factor=1.1, min_neighbors=5):
+        self.cascade = cv2.CascadeClassifier(cascade_path)
+        if self.cascade.empty():
+            raise FileNotFoundError(f"Nie można wczytać kaskady: {cascade_path}")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+
+    def detect(self, frame, min_size=(0, 0), max_size=(0, 0)):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        boxes, _, weights = self.cascade.detectMultiScale3(
+            gray, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors,
+            minSize=min_size, maxSize=max_size, outputRejectLevels=True
+        )
+        if len(boxes) == 0:
+            return empty_result()
+        return np.asarray(boxes, dtype=np.int32), np.asarray(weights, dtype=np.float32).ravel()
+
+
+class LBPBackend(CascadeBackend):
+    """Kaskada LBP - szybsza od Haara kosztem nieco niższej czułości"""
+
+    def __init__(self, model='lbpcascade_frontalface_improved.xml', models_dir=MODELS_DIR,
+                 scale_factor=1.1, min_neighbors=4):
+        super().__init__(model_path(model, models_dir), scale_factor, min_neighbors)
+
+
+class SSDBackend:
+    """Detektor DNN SSD (ResNet-10, Caffe) z modułu cv2.dnn"""
+
+    grayscale = False
+
+    def __init__(self, config='deploy.prototxt', model='res10_300x300_ssd_iter_140000.caffemodel',
+                 models_dir=MODELS_DIR, conf_threshold=0.5, input_size=(300, 300)):
+        self.net = cv2.dnn.readNetFromCaffe(model_path(config, models_dir), model_path(model, models_dir))
+        self.conf_threshold = conf_threshold
+        self.input_size = tuple(input_size)
+
+    def detect(self, frame, min_size=(0, 0), max_size=(0, 0)):
+        h, w = frame.shape[:2]
+        blob = cv2.dnn.blobFromImage(frame, 1.0, self.input_size, (104.0, 177.0, 123.0))
+        self.net.setInput(blob)
+        detections = self.net.forward()[0, 0]
+
+        detections = detections[detections[:, 2] >= self.conf_threshold]
+        if len(detections) == 0:
+            return empty_result()
+        corners = np.clip(detections[:, 3:7] * (w, h, w, h), 0, (w, h, w, h))
+        boxes = np.column_stack([corners[:, :2], corners[:, 2:] - corners[:, :2]]).astype(np.int32)
+        return filter_by_size(boxes, detections[:, 2].astype(np.float32), min_size, max_size)
+
+
+class YuNetBackend:
+    """Detektor YuNet (cv2.FaceDetectorYN, model ONNX)"""
+
+    grayscale = False
+
+    def __init__(self, model='face_detection_yunet_2023mar.onnx', models_dir=MODELS_DIR,
+                 conf_threshold=0.6, nms_threshold=0.3, top_k=50):
+        self.detector = cv2.FaceDetectorYN.create(
+            model_path(model, models_dir), "", (320, 320), conf_threshold, nms_threshold, top_k
+        )
+        self.input_size = (320, 320)
+
+    def detect(self, frame, min_size=(0, 0), max_size=(0, 0)):
+        h, w = frame.shape[:2]
+        if (w, h) != self.input_size:
+            self.detector.setInputSize((w, h))
+            self.input_size = (w, h)
+        _, faces = self.detector.detect(frame)
+        if faces is None or len(faces) == 0:
+            return empty_result()
+        boxes = np.round(faces[:, :4]).astype(np.int32)
+        boxes[:, :2] = np.maximum(boxes[:, :2], 0)
+        return filter_by_size(boxes, faces[:, 14].astype(np.float32), min_size, max_size)
+
+
+DETECTOR_BACKENDS = {
+    'haar': CascadeBackend,
+    'lbp': LBPBackend,
+    'ssd': SSDBackend,
+    'yunet': YuNetBackend,
+}
+
+
+def create_backend(name='haar', **kwargs):
+    if name not in DETECTOR_BACKENDS:
+        raise ValueError(f"Nieznany backend detektora: {name}")
+    return DETECTOR_BACKENDS[name](**kwargs)
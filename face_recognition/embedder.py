@@ -1,15 +1,30 @@
 import numpy as np
-from keras_facenet import FaceNet
+
+from face_recognition.model_registry import model_registry
 
 class FaceEmbedder:
-    def __init__(self):
-        self.embedder = FaceNet()
+    """Embeddingi FaceNet; model jest współdzielony przez wszystkie instancje (model_registry)"""
+
+    @property
+    def embedder(self):
+        return model_registry.get('facenet')
 
     def get_embedding(self, preprocessed_face):
-        face = preprocessed_face[0]  # (160,160,3)
-        emb = self.embedder.embeddings([face])[0]
+        return self.get_embeddings(preprocessed_face)[0]
+
+    def get_embeddings(self, batch):
+        """
+        Liczy embeddingi dla całej paczki twarzy w jednym wywołaniu FaceNet.
+        batch: tablica (N,160,160,3) albo lista wyników preprocess_face
+        (również z kilku klatek). Zwraca tablicę (N,512) po L2-normalizacji.
+        """
+        if isinstance(batch, (list, tuple)):
+            batch = np.concatenate([np.reshape(face, (-1, 160, 160, 3)) for face in batch])
+        if len(batch) == 0:
+            return np.empty((0, 512), dtype=np.float32)
+
+        embs = np.asarray(self.embedder.embeddings(batch), dtype=np.float32)
         # L2‑normalizacja
-        norm = np.linalg.norm(emb)
-        if norm > 0:
-            emb = emb / norm
-        return emb
\ No newline at end of file
+        norms = np.linalg.norm(embs, axis=1, keepdims=True)
+        np.divide(embs, norms, out=embs, where=norms > 0)
+        return embs
@@ -0,0 +1,88 @@
+import cv2
+import numpy as np
+
+
+def box_iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+class FaceResultCache:
+    """
+    Ponowne użycie embeddingu i wyniku dopasowania dla twarzy, która się nie zmieniła.
+    Twarz uznajemy za tę samą tylko wtedy, gdy jednocześnie ramka pokrywa się z poprzednią
+    (IoU >= iou_threshold) i miniatura wycinka w skali szarości (thumb_size x thumb_size)
+    różni się średnio o nie więcej niż diff_threshold poziomów jasności. Co refresh_every
+    klatek embedding jest liczony od nowa, a zmiana galerii unieważnia cały cache.
+    """
+
+    def __init__(self, iou_threshold=0.8, diff_threshold=6.0, thumb_size=16, refresh_every=10):
+        self.iou_threshold = iou_threshold
+        self.diff_threshold = diff_threshold
+        self.thumb_size = thumb_size
+        self.refresh_every = refresh_every
+        self.entries = []  # [(box, thumb, result, age)]
+        self.gallery = None
+        self.pending = None
+
+    def thumbnail(self, frame, box):
+        x, y, w, h = box
+        crop = cv2.resize(frame[y:y + h, x:x + w], (self.thumb_size, self.thumb_size), interpolation=cv2.INTER_AREA)
+        if crop.ndim == 3:
+            crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+        return crop.astype(np.float32)
+
+    def lookup(self, frame, boxes, gallery):
+        """
+        Zwraca listę wyników z poprzednich klatek (None = trzeba policzyć od nowa)
+        dla każdej ramki z boxes. Wynik po uzupełnieniu przekazujemy do update().
+        """
+        if gallery is not self.gallery:
+            self.entries = []
+            self.gallery = gallery
+
+        results, pending = [], []
+        used = set()
+        for box in boxes:
+            thumb = self.thumbnail(frame, box)
+            hit = None
+            for i, (ref_box, ref_thumb, result, age) in enumerate(self.entries):
+                if i in used or age + 1 >= self.refresh_every:
+                    continue
+                if box_iou(box, ref_box) < self.iou_threshold:
+                    continue
+                if np.mean(np.abs(thumb - ref_thumb)) > self.diff_threshold:
+                    continue
+                hit = i
+                break
+            if hit is None:
+                results.append(None)
+                pending.append((tuple(box), thumb, 0))
+            else:
+                # Porównujemy zawsze z klatką, dla której wynik był liczony,
+                # aby powolny dryf obrazu się nie kumulował
+                used.add(hit)
+                ref_box, ref_thumb, result, age = self.entries[hit]
+                results.append(result)
+                pending.append((ref_box, ref_thumb, age + 1))
+
+        self.pending = pending
+        return results
+
+    def update(self, results):
+        """Zapamiętuje wyniki bieżącej klatki (po uzupełnieniu braków z lookup)"""
+        self.entries = [
+            (box, thumb, result, age)
+            for (box, thumb, age), result in zip(self.pending, results)
+        ]
+        self.pending = None
+
+    def reset(self):
+        self.entries = []
+        self.gallery = None
+        self.pending = None
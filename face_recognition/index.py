@@ -0,0 +1,201 @@
+import threading
+
+import numpy as np
+
+
+def best_per_user(user_ids, scores):
+    """Redukuje wyniki próbek do najlepszego wyniku per użytkownik (kolejność dowolna)"""
+    if len(scores) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    order = np.argsort(-scores, kind='stable')
+    unique_ids, first = np.unique(user_ids[order], return_index=True)
+    return unique_ids, scores[order][first]
+
+
+class BruteForceIndex:
+    """Dokładne przeszukiwanie całej galerii - jeden iloczyn macierz-wektor"""
+
+    def sync(self, gallery):
+        self.gallery = gallery
+
+    def search(self, embedding):
+        gallery = self.gallery
+        if len(gallery) == 0:
+            return gallery.unique_ids, np.empty(0, dtype=np.float32)
+        scores = gallery.matrix @ embedding
+        return gallery.unique_ids, np.maximum.reduceat(scores, gallery.segment_starts)
+
+
+def sorted_contains(sorted_values, values):
+    """Maska: które z values występują w posortowanej tablicy sorted_values"""
+    pos = np.searchsorted(sorted_values, values)
+    found = np.zeros(len(values), dtype=bool)
+    inside = pos < len(sorted_values)
+    found[inside] = sorted_values[pos[inside]] == values[inside]
+    return found
+
+
+class IVFLists:
+    """
+    Wytrenowane centroidy i listy odwrócone (wektory, user_id i Embeddings.id
+    przypisanych wierszy). Wiersze można dopisywać i usuwać bez ponownego treningu.
+    """
+
+    def __init__(self, centroids, dim):
+        self.centroids = centroids
+        self.trained_size = 0
+        self.indexed_ids = np.empty(0, dtype=np.int64)
+        self.vectors = [np.empty((0, dim), dtype=np.float32) for _ in range(len(centroids))]
+        self.user_ids = [np.empty(0, dtype=np.int64) for _ in range(len(centroids))]
+        self.embedding_ids = [np.empty(0, dtype=np.int64) for _ in range(len(centroids))]
+
+    def add(self, gallery, rows):
+        matrix = gallery.matrix[rows]
+        user_ids = gallery.user_ids[rows]
+        embedding_ids = gallery.embedding_ids[rows]
+        assign = np.argmax(matrix @ self.centroids.T, axis=1)
+        for k in np.unique(assign):
+            members = assign == k
+            self.vectors[k] = np.concatenate([self.vectors[k], matrix[members]])
+            self.user_ids[k] = np.concatenate([self.user_ids[k], user_ids[members]])
+            self.embedding_ids[k] = np.concatenate([self.embedding_ids[k], embedding_ids[members]])
+        new_ids = np.sort(embedding_ids)
+        self.indexed_ids = np.insert(self.indexed_ids, np.searchsorted(self.indexed_ids, new_ids), new_ids)
+
+    def remove(self, removed_ids):
+        removed_ids = np.sort(removed_ids)
+        for k, ids in enumerate(self.embedding_ids):
+            keep = ~sorted_contains(removed_ids, ids)
+            if not keep.all():
+                self.vectors[k] = self.vectors[k][keep]
+                self.user_ids[k] = self.user_ids[k][keep]
+                self.embedding_ids[k] = ids[keep]
+        self.indexed_ids = self.indexed_ids[~sorted_contains(removed_ids, self.indexed_ids)]
+
+    def update(self, gallery):
+        """Doprowadza listy do stanu galerii: usuwa skasowane i dopisuje nowe wiersze"""
+        removed = self.indexed_ids[~sorted_contains(np.sort(gallery.embedding_ids), self.indexed_ids)]
+        if len(removed):
+            self.remove(removed)
+        new_rows = np.flatnonzero(~sorted_contains(self.indexed_ids, gallery.embedding_ids))
+        if len(new_rows):
+            self.add(gallery, new_rows)
+
+
+class IVFIndex:
+    """
+    Indeks IVF (inverted file): galeria dzielona sferycznym k-means na n_lists
+    partycji, zapytanie przeszukuje tylko n_probe najbliższych partycji.
+    n_probe jest pokrętłem recall/latency - n_probe == n_lists daje wynik dokładny.
+
+    Trening k-means trwa do sekund przy dziesiątkach tysięcy próbek, więc działa
+    w osobnym wątku. Do czasu podmiany zapytania obsługuje poprzedni indeks
+    (albo przeszukiwanie dokładne, gdy indeksu jeszcze nie ma). Nowe i usunięte
+    wiersze galerii są nanoszone na listy przyrostowo, bez ponownego treningu.
+    """
+
+    def __init__(self, n_lists=None, n_probe=8, min_train_size=2000, kmeans_iters=10, seed=0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.min_train_size = min_train_size
+        self.kmeans_iters = kmeans_iters
+        self.rng = np.random.default_rng(seed)
+
+        self.gallery = None
+        self.exact = BruteForceIndex()
+        self.lists = None
+        self.built = None
+        self.thread = None
+
+    def sync(self, gallery):
+        """Synchronizuje indeks z galerią; trening zlecany jest wątkowi w tle"""
+        built = self.built
+        if built is not None:
+            # Trening w tle zakończony - podmiana i naniesienie zmian galerii z czasu treningu
+            self.built = None
+            self.lists = built
+            self.gallery = None
+        if gallery is self.gallery:
+            return
+        self.gallery = gallery
+        self.exact.sync(gallery)
+
+        # Mała galeria - przeszukiwanie dokładne jest szybsze niż partycjonowanie
+        if len(gallery) < self.min_train_size:
+            self.lists = None
+            return
+
+        if self.lists is None:
+            self.start_training(gallery)
+            return
+
+        self.lists.update(gallery)
+        # Galeria podwoiła się (albo skurczyła o połowę) od treningu - centroidy
+        # przestają być reprezentatywne; do czasu podmiany działają stare
+        if not self.lists.trained_size / 2 <= len(gallery) <= 2 * self.lists.trained_size:
+            self.start_training(gallery)
+
+    def start_training(self, gallery):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.thread = threading.Thread(target=self.train, args=(gallery,), name='IVFIndexTraining', daemon=True)
+        self.thread.start()
+
+    def train(self, gallery):
+        """Trenuje centroidy od zera i przypisuje wszystkie wiersze galerii (wątek w tle)"""
+        try:
+            matrix = gallery.matrix
+            n_lists = self.n_lists or max(1, int(np.sqrt(len(matrix))))
+            lists = IVFLists(self._train(matrix, n_lists), matrix.shape[1])
+            lists.trained_size = len(matrix)
+            lists.add(gallery, np.arange(len(matrix)))
+            self.built = lists
+        except Exception as e:
+            print(f"Error training IVF index: {e}")
+
+    def wait(self, timeout=None):
+        """Czeka na zakończenie treningu w tle (podmiana następuje przy kolejnym sync)"""
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def search(self, embedding):
+        lists = self.lists
+        if lists is None:
+            return self.exact.search(embedding)
+
+        n_probe = min(self.n_probe, len(lists.centroids))
+        centroid_scores = lists.centroids @ embedding
+        probe = np.argpartition(-centroid_scores, n_probe - 1)[:n_probe]
+
+        vectors = np.concatenate([lists.vectors[i] for i in probe])
+        user_ids = np.concatenate([lists.user_ids[i] for i in probe])
+        return best_per_user(user_ids, vectors @ embedding)
+
+    def _train(self, matrix, n_lists):
+        # Sferyczny k-means na próbce galerii (wektory są L2-znormalizowane)
+        sample_size = min(len(matrix), n_lists * 64)
+        sample = matrix[self.rng.choice(len(matrix), sample_size, replace=False)]
+        centroids = sample[self.rng.choice(sample_size, n_lists, replace=False)].copy()
+
+        for _ in range(self.kmeans_iters):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for k in range(n_lists):
+                members = sample[assign == k]
+                if len(members):
+                    centroids[k] = members.sum(axis=0)
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            np.divide(centroids, norms, out=centroids, where=norms > 0)
+        return centroids
+
+
+# Rejestr dostępnych backendów indeksu galerii
+INDEX_BACKENDS = {
+    'brute': BruteForceIndex,
+    'ivf': IVFIndex,
+}
+
+
+def create_index(name='brute', **kwargs):
+    if name not in INDEX_BACKENDS:
+        raise ValueError(f"Nieznany backend indeksu: {name}")
+    return INDEX_BACKENDS[name](**kwargs)
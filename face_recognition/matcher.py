@@ -1,9 +1,13 @@
 import numpy as np
 from numpy.linalg import norm
 
+from face_recognition.index import create_index
+
 class FaceMatcher:
-    def __init__(self, threshold=0.60):
+    def __init__(self, threshold=0.60, index='brute', **index_options):
         self.threshold = threshold
+        # Backend indeksu galerii: 'brute' (dokładny) lub 'ivf' (przybliżony, n_probe=recall/latency)
+        self.index = create_index(index, **index_options)
 
     def cosine_similarity(self, emb1, emb2):
         return np.dot(emb1, emb2) / (norm(emb1) * norm(emb2))
@@ -18,4 +22,31 @@ class FaceMatcher:
                 best_score, best_id = score, user_id
         if best_score >= self.threshold:
             return best_id, best_score
-        return None, best_score
\ No newline at end of file
+        return None, best_score
+
+    def user_scores(self, embedding, gallery):
+        """Najlepszy wynik per użytkownik dla znormalizowanej galerii (GallerySnapshot)"""
+        self.index.sync(gallery)
+        # Embedding z FaceEmbedder jest już L2-znormalizowany - wystarczy iloczyn skalarny
+        return self.index.search(np.asarray(embedding, dtype=np.float32))
+
+    def top_k(self, embedding, gallery, k=5):
+        """Zwraca k najlepszych kandydatów jako listę (user_id, score), malejąco"""
+        user_ids, scores = self.user_scores(embedding, gallery)
+        if len(scores) == 0:
+            return []
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(int(user_ids[i]), float(scores[i])) for i in best]
+
+    def match_gallery(self, embedding, gallery):
+        """Odpowiednik match() dla galerii w postaci macierzy (N, 512)"""
+        user_ids, scores = self.user_scores(embedding, gallery)
+        if len(scores) == 0:
+            return None, -1
+        best = int(np.argmax(scores))
+        best_score = float(scores[best])
+        if best_score >= self.threshold:
+            return int(user_ids[best]), best_score
+        return None, best_score
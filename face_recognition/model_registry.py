@@ -0,0 +1,38 @@
+import threading
+
+
+def load_facenet():
+    # Import TensorFlow/keras_facenet dopiero przy pierwszym użyciu modelu
+    from keras_facenet import FaceNet
+    return FaceNet()
+
+
+class ModelRegistry:
+    """
+    Modele współdzielone przez cały proces. Każdy model jest ładowany raz,
+    przy pierwszym żądaniu (z dowolnego wątku), a kolejne okna dostają tę samą instancję.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaders = {'facenet': load_facenet}
+        self.models = {}
+
+    def get(self, name='facenet'):
+        model = self.models.get(name)
+        if model is not None:
+            return model
+
+        with self.lock:
+            if name not in self.models:
+                if name not in self.loaders:
+                    raise ValueError(f"Nieznany model: {name}")
+                self.models[name] = self.loaders[name]()
+            return self.models[name]
+
+    def is_loaded(self, name='facenet'):
+        return name in self.models
+
+
+# Globalny rejestr modeli
+model_registry = ModelRegistry()
@@ -1,9 +1,20 @@
+import time
+STARTED = time.perf_counter()
+
 import sys
+from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import QApplication
 from ui.login_screen import LoginScreen
 
+
+def report_startup_time():
+    print(f"Czas do wyświetlenia okna: {time.perf_counter() - STARTED:.2f}s")
+
+
 if __name__ == '__main__':
     app = QApplication(sys.argv)
     login = LoginScreen()
     login.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    # Wywoływane po pierwszym przebiegu pętli zdarzeń, gdy okno jest już narysowane
+    QTimer.singleShot(0, report_startup_time)
+    sys.exit(app.exec_())
@@ -0,0 +1,209 @@
+"""
+Przyrostowe agregaty metryk: sumy, liczności, min/max i kwantyle strumieniowe
+(P² dla całej sesji, histogramy minutowe dla okien czasowych).
+Każda nowa próbka aktualizuje agregaty w O(1); odczyt to gotowy, niezmienny snapshot.
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+
+StatsSnapshot = namedtuple('StatsSnapshot', ['count', 'mean', 'min', 'max', 'p50', 'p95'])
+
+EMPTY_STATS = StatsSnapshot(0, 0.0, 0.0, 0.0, 0.0, 0.0)
+
+
+class P2Quantile:
+    """
+    Estymator kwantyla algorytmem P² (Jain & Chlamtac) - pięć znaczników,
+    stała pamięć, bez przechowywania próbek.
+    """
+
+    def __init__(self, p):
+        self.p = p
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        heights = self.heights
+        if len(heights) < 5:
+            heights.append(x)
+            heights.sort()
+            return
+
+        if x < heights[0]:
+            heights[0] = x
+            k = 0
+        elif x >= heights[4]:
+            heights[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if heights[i] <= x < heights[i + 1])
+
+        for i in range(k + 1, 5):
+            self.positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        for i in (1, 2, 3):
+            d = self.desired[i] - self.positions[i]
+            if (d >= 1 and self.positions[i + 1] - self.positions[i] > 1) or \
+               (d <= -1 and self.positions[i - 1] - self.positions[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self._parabolic(i, d)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = self._linear(i, d)
+                heights[i] = height
+                self.positions[i] += d
+
+    def _parabolic(self, i, d):
+        q, n = self.heights, self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def _linear(self, i, d):
+        q, n = self.heights, self.positions
+        return q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+
+    def value(self):
+        heights = self.heights
+        if not heights:
+            return 0.0
+        if len(heights) < 5:
+            # Za mało próbek na znaczniki - kwantyl z posortowanej listy
+            return heights[min(len(heights) - 1, int(round(self.p * (len(heights) - 1))))]
+        return heights[2]
+
+
+class RunningStats:
+    """Liczność, suma, min/max i kwantyle (P²) aktualizowane przyrostowo"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.p50 = P2Quantile(0.5)
+        self.p95 = P2Quantile(0.95)
+
+    def add(self, x):
+        x = float(x)
+        self.count += 1
+        self.total += x
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        self.p50.add(x)
+        self.p95.add(x)
+
+    def snapshot(self):
+        if not self.count:
+            return EMPTY_STATS
+        return StatsSnapshot(self.count, self.total / self.count, self.min, self.max,
+                             self.p50.value(), self.p95.value())
+
+
+def histogram_quantiles(edges, counts, qs):
+    """Kwantyle z histogramu (interpolacja liniowa wewnątrz przedziału)"""
+    cumulative = np.cumsum(counts)
+    total = cumulative[-1] if len(cumulative) else 0
+    if not total:
+        return [0.0] * len(qs)
+    values = []
+    for q in qs:
+        i = min(int(np.searchsorted(cumulative, q * total, side='left')), len(counts) - 1)
+        before = cumulative[i - 1] if i > 0 else 0
+        fraction = (q * total - before) / counts[i] if counts[i] else 0.0
+        values.append(float(edges[i] + fraction * (edges[i + 1] - edges[i])))
+    return values
+
+
+def histogram_quantile(edges, counts, q):
+    """Kwantyl z histogramu (interpolacja liniowa wewnątrz przedziału)"""
+    return histogram_quantiles(edges, counts, (q,))[0]
+
+
+class WindowedStats:
+    """
+    Agregaty w przedziałach minutowych: liczność, suma, min, max i histogram
+    o stałych granicach (edges). Dla pełnego okna (`minutes` minut) utrzymywane
+    są sumy bieżące: nowa próbka jest do nich dodawana, a przedział wypadający
+    z okna odejmowany, więc snapshot nie scala przedziałów (koszt zależy tylko
+    od liczby przedziałów histogramu). Statystyki krótszego okna liczone są
+    przez scalenie przedziałów. Wartości spoza zakresu histogramu trafiają do
+    skrajnych przedziałów.
+    """
+
+    def __init__(self, edges, minutes=60):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.minutes = minutes
+        self.buckets = {}  # minute -> [count, total, min, max, histogram]
+        self.oldest = None  # najstarsza minuta w self.buckets
+        # Sumy bieżące po wszystkich przedziałach w self.buckets
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.histogram = np.zeros(len(self.edges) - 1, dtype=np.int64)
+
+    def add(self, timestamp, x):
+        x = float(x)
+        minute = int(timestamp // 60)
+        bucket = self.buckets.get(minute)
+        if bucket is None:
+            self.expire(minute)
+            bucket = self.buckets[minute] = [0, 0.0, math.inf, -math.inf,
+                                             np.zeros(len(self.edges) - 1, dtype=np.int64)]
+            if self.oldest is None or minute < self.oldest:
+                self.oldest = minute
+        i = int(np.searchsorted(self.edges, x, side='right')) - 1
+        i = min(max(i, 0), len(bucket[4]) - 1)
+        bucket[0] += 1
+        bucket[1] += x
+        bucket[2] = min(bucket[2], x)
+        bucket[3] = max(bucket[3], x)
+        bucket[4][i] += 1
+        self.count += 1
+        self.total += x
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        self.histogram[i] += 1
+
+    def expire(self, minute):
+        """Odejmuje od sum bieżących przedziały, które wypadły z okna kończącego się w `minute`"""
+        if self.oldest is None or self.oldest > minute - self.minutes:
+            return
+        for old in [m for m in self.buckets if m <= minute - self.minutes]:
+            count, total, _, _, histogram = self.buckets.pop(old)
+            self.count -= count
+            self.total -= total
+            self.histogram -= histogram
+        # Min/max nie da się odjąć - liczone od nowa z pozostałych przedziałów (raz na minutę)
+        buckets = self.buckets.values()
+        self.oldest = min(self.buckets) if self.buckets else None
+        self.min = min((b[2] for b in buckets), default=math.inf)
+        self.max = max((b[3] for b in buckets), default=-math.inf)
+        if not self.count:
+            self.total = 0.0  # bez kumulacji błędów zaokrągleń
+
+    def snapshot(self, now, minutes=None):
+        if minutes is None or minutes == self.minutes:
+            self.expire(int(now // 60))
+            count, total, low, high, histogram = self.count, self.total, self.min, self.max, self.histogram
+        else:
+            first = int(now // 60) - minutes + 1
+            buckets = [b for m, b in self.buckets.items() if m >= first]
+            count = sum(b[0] for b in buckets)
+            if not count:
+                return EMPTY_STATS
+            total = sum(b[1] for b in buckets)
+            low = min(b[2] for b in buckets)
+            high = max(b[3] for b in buckets)
+            histogram = np.sum([b[4] for b in buckets], axis=0)
+        if not count:
+            return EMPTY_STATS
+        p50, p95 = histogram_quantiles(self.edges, histogram, (0.5, 0.95))
+        return StatsSnapshot(count, total / count, low, high, p50, p95)
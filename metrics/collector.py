@@ -1,104 +1,274 @@
 import time
 import threading
-from collections import deque
-from datetime import datetime, timedelta
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+from types import MappingProxyType
+
+import numpy as np
+
+from metrics.aggregates import RunningStats, WindowedStats
+from metrics.store import metrics_store
+
+# Niezmienny obraz metryk publikowany po każdym zapisie (podmiana jednej referencji).
+# recent: statystyki z ostatniej godziny, session: od uruchomienia programu;
+# oba to mapowania nazwa -> StatsSnapshot(count, mean, min, max, p50, p95);
+# stages: etap potoku -> StatsSnapshot czasów (s) z ostatniej godziny
+MetricsSnapshot = namedtuple('MetricsSnapshot', [
+    'published', 'total_attempts', 'successful_auths', 'failed_auths', 'accuracy', 'recent', 'session', 'stages'
+])
+
+# Granice histogramów okien czasowych
+STAT_EDGES = {
+    'confidence': np.linspace(0, 1, 101),
+    'detection_time': np.linspace(0, 30, 301),  # s
+    'face_quality': np.linspace(0, 100, 101),
+}
+
+# Etapy przetwarzania klatki: capture - dekodowanie klatki z kamery (bez czekania na nią),
+# db_enqueue - kolejkowanie zapisów w wątku rozpoznawania, db - zatwierdzenie paczki
+# zapisów w bazie (wątek WriteBatcher), pozostałe - FaceDetector / FaceAuthManager / GUI
+PIPELINE_STAGES = ('capture', 'gray', 'detect', 'preprocess', 'inference', 'gallery', 'matching',
+                   'db_enqueue', 'db', 'render')
+
+# Granice histogramów czasów etapów: logarytmicznie od 10 µs do 10 s
+STAGE_EDGES = np.concatenate(([0.0], np.geomspace(1e-5, 10, 121)))
+
+
+class StageTimer:
+    """Sumuje czasy (perf_counter, sekundy) nazwanych etapów przetwarzania jednej klatki"""
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+
+class RingBuffer:
+    """
+    Prealokowany bufor cykliczny próbek (znacznik monotoniczny + kolumny liczbowe).
+    Zapis chroni licznik sekwencji (seqlock): czytelnik kopiuje dane bez blokady
+    i powtarza odczyt, jeśli w międzyczasie nastąpił zapis - nigdy nie blokuje
+    wątku piszącego. Zapisujący muszą być serializowani przez wywołującego.
+    """
+
+    def __init__(self, capacity, **columns):
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in columns.items()}
+        self.count = 0  # liczba wszystkich zapisanych próbek
+        self.seq = 0    # nieparzysty w trakcie zapisu
+
+    def append(self, timestamp, **values):
+        self.seq += 1
+        i = self.count % self.capacity
+        self.times[i] = timestamp
+        for name, value in values.items():
+            self.columns[name][i] = value
+        self.count += 1
+        self.seq += 1
+
+    def window(self, since=None):
+        """
+        Zwraca (times, {kolumna: wartości}) w kolejności chronologicznej dla
+        próbek o znaczniku >= since. Okno jest wyznaczane wyszukiwaniem binarnym
+        w dwóch posortowanych segmentach bufora.
+        """
+        while True:
+            seq = self.seq
+            if seq & 1:
+                time.sleep(0)
+                continue
+
+            count = self.count
+            n = min(count, self.capacity)
+            head = count % self.capacity if count > self.capacity else 0
+            # Segmenty w kolejności chronologicznej: [head:n] i [0:head]
+            segments = [(head, n), (0, head)] if head else [(0, n)]
+
+            parts = []
+            for start, stop in segments:
+                if since is not None:
+                    start += int(np.searchsorted(self.times[start:stop], since, side='left'))
+                if start < stop:
+                    parts.append((start, stop))
+
+            times = np.concatenate([self.times[a:b] for a, b in parts]) if parts else np.empty(0)
+            columns = {
+                name: np.concatenate([values[a:b] for a, b in parts]) if parts else values[:0].copy()
+                for name, values in self.columns.items()
+            }
+
+            if self.seq == seq:
+                return times, columns
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
 
 class MetricsCollector:
     """Collects real-time metrics for face recognition system"""
 
-    def __init__(self, max_samples=1000):
+    def __init__(self, max_samples=1000, store=None, publish_interval=1.0):
         self.max_samples = max_samples
+        # Najdłuższy wiek snapshotu: starszy jest odświeżany przy odczycie (okno 'recent' się przesuwa)
+        self.publish_interval = publish_interval
+        # Optional persistent store (metrics.store.MetricsStore) fed with every sample
+        self.store = store
 
-        # Authentication metrics
-        self.auth_attempts = deque(maxlen=max_samples)  # (timestamp, success, confidence)
-        self.detection_times = deque(maxlen=max_samples)  # (timestamp, detection_time)
-        self.confidence_scores = deque(maxlen=max_samples)  # (timestamp, confidence)
-        self.face_quality_scores = deque(maxlen=max_samples)  # (timestamp, quality_score)
+        # Authentication metrics (ring buffers keyed by time.monotonic())
+        self.auth_attempts = RingBuffer(max_samples, success=np.bool_, confidence=np.float32)
+        self.detection_times = RingBuffer(max_samples, detection_time=np.float32)
+        self.face_quality_scores = RingBuffer(max_samples, quality=np.float32)
 
         # Real-time counters
         self.total_attempts = 0
         self.successful_auths = 0
         self.failed_auths = 0
 
-        # Thread safety
+        # Incremental aggregates (O(1) per sample)
+        self.session_stats = {name: RunningStats() for name in STAT_EDGES}
+        self.window_stats = {name: WindowedStats(edges) for name, edges in STAT_EDGES.items()}
+        self.stage_stats = {stage: WindowedStats(STAGE_EDGES) for stage in PIPELINE_STAGES}
+        # Czasy etapów czekające na doliczenie do stage_stats (przy publikacji snapshotu);
+        # deque.append jest atomowe, więc wątki kamery/GUI nie biorą blokady
+        self.pending_stages = deque(maxlen=10000)
+
+        # Serializes writers only - readers never take it
         self.lock = threading.Lock()
+        self.snapshot = None
+        self.publish()
 
     def log_auth_attempt(self, success, confidence, detection_time=0):
         """Log an authentication attempt"""
         with self.lock:
-            timestamp = datetime.now()
-            self.auth_attempts.append((timestamp, success, confidence))
+            timestamp = time.monotonic()
+            self.auth_attempts.append(timestamp, success=success, confidence=confidence)
+            if self.store is not None:
+                self.store.record('auth_success', 1.0 if success else 0.0)
+            self.add_sample('confidence', confidence)
 
             if detection_time > 0:
-                self.detection_times.append((timestamp, detection_time))
-
-            self.confidence_scores.append((timestamp, confidence))
+                self.detection_times.append(timestamp, detection_time=detection_time)
+                self.add_sample('detection_time', detection_time)
 
             self.total_attempts += 1
             if success:
                 self.successful_auths += 1
             else:
                 self.failed_auths += 1
+            self.publish()
 
     def log_face_quality(self, quality_score):
         """Log face detection quality (0-100)"""
         with self.lock:
-            timestamp = datetime.now()
-            self.face_quality_scores.append((timestamp, quality_score))
+            self.face_quality_scores.append(time.monotonic(), quality=quality_score)
+            self.add_sample('face_quality', quality_score)
+            self.publish()
 
-    def get_accuracy_over_time(self, hours=1):
-        """Get accuracy percentage over specified hours"""
-        with self.lock:
-            cutoff_time = datetime.now() - timedelta(hours=hours)
-            recent_attempts = [a for a in self.auth_attempts if a[0] >= cutoff_time]
+    def log_stage_timings(self, timings):
+        """
+        Log per-stage processing times in seconds ({stage: seconds}, see PIPELINE_STAGES).
+        Called for every frame from several threads, so it only buffers the timings
+        without taking the lock; they are added to the histograms on the next publish
+        (at least every publish_interval seconds, see get_snapshot).
+        """
+        self.pending_stages.append((time.time(), timings))
 
-            if not recent_attempts:
-                return [], []
+    def drain_stage_timings(self):
+        """Dolicza zbuforowane czasy etapów do histogramów (wywoływane pod self.lock)"""
+        pending = self.pending_stages
+        while pending:
+            timestamp, timings = pending.popleft()
+            for stage, seconds in timings.items():
+                self.stage_stats[stage].add(timestamp, seconds)
 
-            # Group by 5-minute intervals
-            intervals = {}
-            for timestamp, success, _ in recent_attempts:
-                # Round to 5-minute interval
-                interval = timestamp.replace(second=0, microsecond=0)
-                interval = interval.replace(minute=(interval.minute // 5) * 5)
+    def add_sample(self, name, value):
+        now = time.time()
+        self.session_stats[name].add(value)
+        self.window_stats[name].add(now, value)
+        if self.store is not None:
+            self.store.record(name, value, now)
 
-                if interval not in intervals:
-                    intervals[interval] = {'total': 0, 'success': 0}
+    def publish(self):
+        """Buduje nowy snapshot i podmienia referencję (wywoływane pod self.lock)"""
+        self.drain_stage_timings()
+        now = time.time()
+        total = self.total_attempts
+        self.snapshot = MetricsSnapshot(
+            published=now,
+            total_attempts=total,
+            successful_auths=self.successful_auths,
+            failed_auths=self.failed_auths,
+            accuracy=(self.successful_auths / total * 100) if total > 0 else 0,
+            recent=MappingProxyType({name: stats.snapshot(now) for name, stats in self.window_stats.items()}),
+            session=MappingProxyType({name: stats.snapshot() for name, stats in self.session_stats.items()}),
+            stages=MappingProxyType({stage: stats.snapshot(now) for stage, stats in self.stage_stats.items()}),
+        )
 
-                intervals[interval]['total'] += 1
-                if success:
-                    intervals[interval]['success'] += 1
+    def get_snapshot(self):
+        """
+        Ostatni opublikowany snapshot (bez czekania na blokadę). Snapshot starszy
+        niż publish_interval jest publikowany ponownie, aby z okna 'recent'
+        wypadły stare minuty także bez nowych próbek - chyba że blokadę trzyma
+        akurat zapisujący, wtedy zwracany jest dotychczasowy.
+        """
+        snapshot = self.snapshot
+        if time.time() - snapshot.published >= self.publish_interval and self.lock.acquire(blocking=False):
+            try:
+                self.publish()
+                snapshot = self.snapshot
+            finally:
+                self.lock.release()
+        return snapshot
 
-            # Convert to lists for plotting
-            times = sorted(intervals.keys())
-            accuracies = [intervals[t]['success'] / intervals[t]['total'] * 100 for t in times]
+    @staticmethod
+    def cutoff(hours):
+        return None if hours is None else time.monotonic() - hours * 3600
 
-            return times, accuracies
+    def get_accuracy_over_time(self, hours=1, interval=300):
+        """Get accuracy percentage over specified hours, grouped into 5-minute intervals"""
+        times, columns = self.auth_attempts.window(self.cutoff(hours))
+        if len(times) == 0:
+            return [], []
+
+        # Przedziały wyrównane do zegara ściennego (np. 12:00, 12:05, ...)
+        wall_times = times + (time.time() - time.monotonic())
+        starts, inverse = np.unique(np.floor(wall_times / interval) * interval, return_inverse=True)
+        totals = np.bincount(inverse)
+        successes = np.bincount(inverse, weights=columns['success'])
+        return [datetime.fromtimestamp(t) for t in starts], successes / totals * 100
 
     def get_confidence_distribution(self, hours=1):
-        """Get confidence score distribution"""
-        with self.lock:
-            cutoff_time = datetime.now() - timedelta(hours=hours)
-            recent_scores = [score for timestamp, score in self.confidence_scores if timestamp >= cutoff_time]
-            return recent_scores
+        """Get confidence scores (numpy array); hours=None - all retained samples"""
+        return self.auth_attempts.window(self.cutoff(hours))[1]['confidence']
 
     def get_detection_time_stats(self, hours=1):
-        """Get detection time statistics"""
-        with self.lock:
-            cutoff_time = datetime.now() - timedelta(hours=hours)
-            recent_times = [dt for timestamp, dt in self.detection_times if timestamp >= cutoff_time]
-            return recent_times
+        """Get detection times (numpy array); hours=None - all retained samples"""
+        return self.detection_times.window(self.cutoff(hours))[1]['detection_time']
+
+    def get_face_quality_scores(self, hours=None):
+        """Get face quality scores (numpy array); hours=None - all retained samples"""
+        return self.face_quality_scores.window(self.cutoff(hours))[1]['quality']
 
     def get_current_stats(self):
         """Get current overall statistics"""
-        with self.lock:
-            accuracy = (self.successful_auths / self.total_attempts * 100) if self.total_attempts > 0 else 0
-            return {
-                'total_attempts': self.total_attempts,
-                'successful_auths': self.successful_auths,
-                'failed_auths': self.failed_auths,
-                'accuracy': accuracy
-            }
+        snapshot = self.get_snapshot()
+        return {
+            'total_attempts': snapshot.total_attempts,
+            'successful_auths': snapshot.successful_auths,
+            'failed_auths': snapshot.failed_auths,
+            'accuracy': snapshot.accuracy
+        }
 
 # Global metrics collector instance
-metrics_collector = MetricsCollector()
\ No newline at end of file
+metrics_collector = MetricsCollector(store=metrics_store)
@@ -0,0 +1,217 @@
+"""
+Trwały magazyn szeregów czasowych metryk (SQLite).
+
+Surowe próbki są trzymane przez dobę, a przy każdym zapisie aktualizowane są
+agregaty minutowe i godzinowe (liczność, suma, min, max) z własną retencją.
+Wykresy z długich okresów czytają wyłącznie agregaty - nigdy surowych zdarzeń.
+Zapis wykonuje osobny wątek w paczkach, więc wywołujący tylko wrzuca próbkę do kolejki.
+"""
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+METRICS_DB_PATH = Path(__file__).parent / 'metrics.db'
+
+# Retencja w sekundach: surowe próbki oraz agregaty o danej rozdzielczości
+RAW_RETENTION = 24 * 3600
+ROLLUP_RETENTION = {
+    60: 30 * 24 * 3600,      # agregaty minutowe - 30 dni
+    3600: 365 * 24 * 3600,   # agregaty godzinowe - rok
+}
+
+# Najdłuższy zakres, dla którego wykres czyta agregaty minutowe
+MINUTE_ROLLUP_MAX_SPAN = 12 * 3600
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS MetricSamples (
+        ts REAL NOT NULL,
+        metric TEXT NOT NULL,
+        value REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_metric_samples ON MetricSamples(metric, ts);
+    CREATE TABLE IF NOT EXISTS MetricRollups (
+        resolution INTEGER NOT NULL,
+        metric TEXT NOT NULL,
+        bucket INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        total REAL NOT NULL,
+        min REAL NOT NULL,
+        max REAL NOT NULL,
+        PRIMARY KEY (resolution, metric, bucket)
+    ) WITHOUT ROWID;
+'''
+
+UPSERT_ROLLUP = '''
+    INSERT INTO MetricRollups (resolution, metric, bucket, count, total, min, max)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (resolution, metric, bucket) DO UPDATE SET
+        count = count + excluded.count,
+        total = total + excluded.total,
+        min = MIN(min, excluded.min),
+        max = MAX(max, excluded.max)
+'''
+
+_STOP = object()
+
+
+class MetricsStore:
+    """
+    Magazyn metryk z zapisem w tle. record() jest nieblokujące (przy pełnej
+    kolejce próbka jest odrzucana), a zapis paczki próbek i agregatów odbywa się
+    w jednej transakcji. Odczyty otwierają własne połączenie (WAL).
+    """
+
+    def __init__(self, path=None, maxsize=10000, max_batch=500, max_delay=1.0, prune_interval=600):
+        # None - METRICS_DB_PATH odczytywane dopiero przy pierwszym połączeniu,
+        # więc import modułu nie dotyka pliku, a ścieżkę można podmienić (np. w testach)
+        self.path = path
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.prune_interval = prune_interval
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.initialized = False
+        self.last_prune = 0.0
+        # Wątek zapisu startuje raz, przy tworzeniu magazynu - record() nie bierze blokad
+        self.thread = threading.Thread(target=self.run, name='MetricsStore', daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def connect(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(Path(self.path or METRICS_DB_PATH), timeout=5)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            with self.lock:
+                if not self.initialized:
+                    conn.executescript(SCHEMA)
+                    self.initialized = True
+            self.local.conn = conn
+        return conn
+
+    def record(self, metric, value, timestamp=None):
+        """Kolejkuje próbkę (czas ścienny w sekundach; domyślnie teraz)"""
+        try:
+            self.queue.put_nowait((time.time() if timestamp is None else timestamp, metric, float(value)))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            try:
+                while len(batch) < self.max_batch and batch[-1] is not _STOP:
+                    batch.append(self.queue.get(timeout=self.max_delay))
+            except queue.Empty:
+                pass
+            stop = batch[-1] is _STOP
+            samples = batch[:-1] if stop else batch
+            try:
+                if samples:
+                    self.write(samples)
+                    self.maybe_prune()
+            except Exception as e:
+                print(f"Error writing {len(samples)} metric samples: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+            if stop:
+                return
+
+    def write(self, samples):
+        """Zapisuje surowe próbki i dolicza je do agregatów (jedna transakcja)"""
+        rollups = {}
+        for ts, metric, value in samples:
+            for resolution in ROLLUP_RETENTION:
+                key = (resolution, metric, int(ts // resolution) * resolution)
+                bucket = rollups.get(key)
+                if bucket is None:
+                    rollups[key] = [1, value, value, value]
+                else:
+                    bucket[0] += 1
+                    bucket[1] += value
+                    bucket[2] = min(bucket[2], value)
+                    bucket[3] = max(bucket[3], value)
+
+        conn = self.connect()
+        with conn:
+            conn.executemany('INSERT INTO MetricSamples (ts, metric, value) VALUES (?, ?, ?)', samples)
+            conn.executemany(UPSERT_ROLLUP, [key + tuple(bucket) for key, bucket in rollups.items()])
+
+    def maybe_prune(self, now=None):
+        now = time.time() if now is None else now
+        if now - self.last_prune < self.prune_interval:
+            return
+        self.last_prune = now
+        self.prune(now)
+
+    def prune(self, now=None):
+        """Usuwa dane starsze niż retencja danej rozdzielczości"""
+        now = time.time() if now is None else now
+        conn = self.connect()
+        with conn:
+            conn.execute('DELETE FROM MetricSamples WHERE ts < ?', (now - RAW_RETENTION,))
+            for resolution, retention in ROLLUP_RETENTION.items():
+                conn.execute('DELETE FROM MetricRollups WHERE resolution = ? AND bucket < ?',
+                             (resolution, now - retention))
+
+    def flush(self):
+        """Czeka na zapisanie wszystkich zakolejkowanych próbek"""
+        if self.thread.is_alive():
+            self.queue.join()
+
+    def close(self, timeout=5.0):
+        """Opróżnia kolejkę i zatrzymuje wątek zapisu"""
+        if not self.thread.is_alive():
+            return
+        self.queue.put(_STOP)
+        self.thread.join(timeout)
+
+    @staticmethod
+    def resolution_for(span):
+        """Rozdzielczość agregatów odpowiednia dla zakresu span sekund"""
+        return 60 if span <= MINUTE_ROLLUP_MAX_SPAN else 3600
+
+    def rollups(self, metric, since, until=None, resolution=None):
+        """
+        Zwraca (bucket_starts, count, mean, min, max) jako tablice numpy dla
+        przedziałów [since, until). Bez resolution rozdzielczość dobierana jest
+        do długości zakresu.
+        """
+        until = time.time() if until is None else until
+        resolution = resolution or self.resolution_for(until - since)
+        first = int(since // resolution) * resolution
+        rows = self.connect().execute('''
+            SELECT bucket, count, total, min, max FROM MetricRollups
+            WHERE resolution = ? AND metric = ? AND bucket >= ? AND bucket < ?
+            ORDER BY bucket''', (resolution, metric, first, until)).fetchall()
+        if not rows:
+            empty = np.empty(0)
+            return empty, empty.astype(np.int64), empty, empty, empty
+        buckets, counts, totals, mins, maxs = (np.array(column) for column in zip(*rows))
+        return buckets, counts, totals / counts, mins, maxs
+
+    def samples(self, metric, since, until=None):
+        """Surowe próbki (ts, value) - dostępne tylko z ostatniej doby"""
+        until = time.time() if until is None else until
+        rows = self.connect().execute(
+            'SELECT ts, value FROM MetricSamples WHERE metric = ? AND ts >= ? AND ts < ? ORDER BY ts',
+            (metric, since, until)).fetchall()
+        if not rows:
+            return np.empty(0), np.empty(0)
+        ts, values = zip(*rows)
+        return np.array(ts), np.array(values)
+
+
+# Globalny magazyn metryk
+metrics_store = MetricsStore()
@@ -0,0 +1,212 @@
+import json
+import os
+import shutil
+import smtplib
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+# Skrzynka nadawcza w katalogu pakietu - niezależnie od katalogu roboczego aplikacji
+OUTBOX_PATH = Path(__file__).parent / 'outbox' / 'notifications.jsonl'
+
+
+class AlertDispatcher:
+    """
+    Wysyła powiadomienia e-mail w tle.
+
+    Wiadomości trafiają najpierw do trwałej skrzynki nadawczej (plik JSON-lines),
+    więc niewysłane alerty przetrwają restart aplikacji. Zdjęcie jest kopiowane
+    do katalogu skrzynki, aby usunięcie wpisu (i zdjęcia z magazynu) nie psuło
+    ponawianych wysyłek. Wątek roboczy utrzymuje
+    jedno połączenie SMTP, ponawia nieudane wysyłki z wykładniczym opóźnieniem
+    i ogranicza liczbę wysyłanych wiadomości na minutę.
+    """
+
+    def __init__(self, manager, outbox_path=OUTBOX_PATH,
+                 max_per_minute=6, max_attempts=8, base_backoff=5.0, max_backoff=900.0,
+                 idle_timeout=60.0):
+        self.manager = manager
+        self.outbox_path = Path(outbox_path)
+        self.attachments_dir = self.outbox_path.parent / 'attachments'
+        self.max_per_minute = max_per_minute
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.idle_timeout = idle_timeout
+
+        self.condition = threading.Condition()
+        self.pending = self.load_outbox()
+        self.sent_times = []
+        self.connection = None
+        self.last_used = 0.0
+        self.running = False
+        self.thread = None
+
+    def load_outbox(self):
+        """Wczytuje wiadomości niewysłane w poprzednim uruchomieniu"""
+        if not self.outbox_path.exists():
+            return []
+        pending = []
+        with open(self.outbox_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    pending.append(json.loads(line))
+                except json.JSONDecodeError:
+                    print(f"Pominięto uszkodzony wpis skrzynki nadawczej: {line[:80]}")
+        return pending
+
+    def save_outbox(self):
+        """Zapisuje skrzynkę nadawczą atomowo (plik tymczasowy + podmiana)"""
+        self.outbox_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.outbox_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for item in self.pending:
+                f.write(json.dumps(item) + '\n')
+        os.replace(tmp_path, self.outbox_path)
+
+    def enqueue(self, image_path, confidence_score):
+        """Dodaje alert do kolejki i natychmiast wraca"""
+        item_id = uuid.uuid4().hex
+        item = {
+            'id': item_id,
+            'created': datetime.now().isoformat(),
+            'image_path': str(self.copy_attachment(item_id, image_path)),
+            'confidence': float(confidence_score),
+            'attempts': 0,
+            'next_attempt': time.time()
+        }
+        with self.condition:
+            self.pending.append(item)
+            self.save_outbox()
+            self.condition.notify()
+        self.start()
+        return True
+
+    def copy_attachment(self, item_id, image_path):
+        """Kopiuje zdjęcie do skrzynki; przy błędzie alert wskazuje oryginał"""
+        image_path = Path(image_path)
+        try:
+            self.attachments_dir.mkdir(parents=True, exist_ok=True)
+            target = self.attachments_dir / f"{item_id}{image_path.suffix}"
+            shutil.copyfile(image_path, target)
+            return target
+        except OSError as e:
+            print(f"Error copying alert attachment {image_path}: {e}")
+            return image_path
+
+    def remove(self, item):
+        """Usuwa alert z kolejki razem z jego kopią zdjęcia"""
+        self.pending.remove(item)
+        attachment = Path(item['image_path'])
+        if attachment.parent == self.attachments_dir:
+            attachment.unlink(missing_ok=True)
+
+    def start(self):
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self.run, name='AlertDispatcher', daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=5.0):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+        self.close_connection()
+
+    def run(self):
+        while True:
+            with self.condition:
+                if not self.running:
+                    return
+                item, delay = self.next_due()
+                if item is None:
+                    self.condition.wait(delay)
+                    continue
+
+            self.deliver(item)
+
+    def next_due(self):
+        """Zwraca (element do wysłania, None) albo (None, czas oczekiwania)"""
+        now = time.time()
+
+        # Zamknij bezczynne połączenie zamiast trzymać je bez końca
+        if self.connection is not None and now - self.last_used > self.idle_timeout:
+            self.close_connection()
+
+        if not self.pending:
+            return None, self.idle_timeout
+
+        # Limit wysyłek: co najwyżej max_per_minute wiadomości w oknie 60 s
+        self.sent_times = [t for t in self.sent_times if now - t < 60.0]
+        if len(self.sent_times) >= self.max_per_minute:
+            return None, 60.0 - (now - self.sent_times[0])
+
+        item = min(self.pending, key=lambda i: i['next_attempt'])
+        if item['next_attempt'] > now:
+            return None, item['next_attempt'] - now
+        return item, None
+
+    def deliver(self, item):
+        try:
+            msg = self.manager.build_unauthorized_access_message(
+                item['image_path'], item['confidence'], datetime.fromisoformat(item['created'])
+            )
+            self.get_connection().send_message(msg)
+            self.last_used = time.time()
+            success = True
+        except Exception as e:
+            print(f"Błąd podczas wysyłania powiadomienia: {str(e)}")
+            self.close_connection()
+            success = False
+
+        with self.condition:
+            if success:
+                self.sent_times.append(time.time())
+                self.remove(item)
+            else:
+                item['attempts'] += 1
+                if item['attempts'] >= self.max_attempts:
+                    print(f"Porzucono powiadomienie {item['id']} po {item['attempts']} próbach")
+                    self.remove(item)
+                else:
+                    delay = min(self.base_backoff * 2 ** (item['attempts'] - 1), self.max_backoff)
+                    item['next_attempt'] = time.time() + delay
+            self.save_outbox()
+
+    def get_connection(self):
+        """Zwraca otwarte połączenie SMTP, ponownie używając istniejącego jeśli żyje"""
+        if self.connection is not None:
+            try:
+                if self.connection.noop()[0] == 250:
+                    return self.connection
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self.close_connection()
+
+        self.connection = self.manager.open_connection()
+        return self.connection
+
+    def close_connection(self):
+        if self.connection is None:
+            return
+        try:
+            self.connection.quit()
+        except Exception:
+            pass
+        self.connection = None
+
+    def pending_count(self):
+        with self.condition:
+            return len(self.pending)
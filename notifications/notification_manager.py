@@ -1,3 +1,4 @@
+import atexit
 import os
 import smtplib
 from email.mime.text import MIMEText
@@ -7,15 +8,25 @@ from datetime import datetime
 import json
 from pathlib import Path
 
+from notifications.dispatcher import AlertDispatcher
+
 class NotificationManager:
     def __init__(self):
         self.config_file = Path("config/notification_settings.json")
         self.settings = self.load_settings()
         
-        # Ustawienia domyślne dla Gmail
-        self.smtp_server = "smtp.gmail.com"
-        self.smtp_port = 587
-        
+        # Ustawienia domyślne dla Gmail (można nadpisać w pliku konfiguracyjnym,
+        # np. lokalnym serwerem testowym aiosmtpd bez TLS)
+        self.smtp_server = self.settings.get("smtp_server", "smtp.gmail.com")
+        self.smtp_port = self.settings.get("smtp_port", 587)
+        self.smtp_use_tls = self.settings.get("smtp_use_tls", True)
+        self.smtp_login = self.settings.get("smtp_login", True)
+
+        # Wysyłka odbywa się w tle, poza pętlą kamery
+        self.dispatcher = AlertDispatcher(self)
+        if self.dispatcher.pending_count():
+            self.dispatcher.start()
+
     def load_settings(self):
         """Wczytuje ustawienia z pliku konfiguracyjnego"""
         if not self.config_file.exists():
@@ -45,47 +56,54 @@ class NotificationManager:
         self.settings["email_recipients"] = email_recipients
         self.save_settings()
     
+    def is_configured(self):
+        if not self.settings["email_recipients"] or not self.settings["sender_email"]:
+            return False
+        return bool(self.settings["sender_password"]) or not self.smtp_login
+
     def send_unauthorized_access_notification(self, image_path, confidence_score):
-        """Wysyła powiadomienie o nieautoryzowanym dostępie"""
-        if not self.settings["email_recipients"] or not self.settings["sender_email"] or not self.settings["sender_password"]:
+        """Kolejkuje powiadomienie o nieautoryzowanym dostępie (wysyłka w tle)"""
+        if not self.is_configured():
             print("Błąd: Brak skonfigurowanych ustawień powiadomień")
             return False
-            
-        try:
-            msg = MIMEMultipart()
-            msg['Subject'] = 'ALERT: Wykryto próbę nieautoryzowanego dostępu!'
-            msg['From'] = self.settings["sender_email"]
-            msg['To'] = ', '.join(self.settings["email_recipients"])
-            
-            # Treść wiadomości
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            text_content = f"""
-            Wykryto próbę nieautoryzowanego dostępu!
-            
-            Data i godzina: {current_time}
-            Poziom pewności rozpoznania: {confidence_score:.2%}
-            
-            W załączniku znajduje się zdjęcie osoby próbującej uzyskać dostęp.
-            """
-            msg.attach(MIMEText(text_content, 'plain', 'utf-8'))
-            
-            # Załączanie zdjęcia
-            with open(image_path, 'rb') as f:
-                img = MIMEImage(f.read())
-                img.add_header('Content-Disposition', 'attachment', filename=os.path.basename(image_path))
-                msg.attach(img)
-            
-            # Wysyłanie emaila
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.settings["sender_email"], self.settings["sender_password"])
-                server.send_message(msg)
-            
-            return True
-            
-        except Exception as e:
-            print(f"Błąd podczas wysyłania powiadomienia: {str(e)}")
-            return False
+        return self.dispatcher.enqueue(image_path, confidence_score)
+
+    def build_unauthorized_access_message(self, image_path, confidence_score, timestamp=None):
+        """Buduje wiadomość z alertem i zdjęciem w załączniku"""
+        msg = MIMEMultipart()
+        msg['Subject'] = 'ALERT: Wykryto próbę nieautoryzowanego dostępu!'
+        msg['From'] = self.settings["sender_email"]
+        msg['To'] = ', '.join(self.settings["email_recipients"])
+
+        # Treść wiadomości
+        current_time = (timestamp or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+        text_content = f"""
+        Wykryto próbę nieautoryzowanego dostępu!
+        
+        Data i godzina: {current_time}
+        Poziom pewności rozpoznania: {confidence_score:.2%}
+        
+        W załączniku znajduje się zdjęcie osoby próbującej uzyskać dostęp.
+        """
+        msg.attach(MIMEText(text_content, 'plain', 'utf-8'))
+
+        # Załączanie zdjęcia
+        with open(image_path, 'rb') as f:
+            img = MIMEImage(f.read())
+            img.add_header('Content-Disposition', 'attachment', filename=os.path.basename(image_path))
+            msg.attach(img)
+
+        return msg
+
+    def open_connection(self):
+        """Otwiera połączenie SMTP (STARTTLS i logowanie zgodnie z ustawieniami)"""
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30)
+        if self.smtp_use_tls:
+            server.starttls()
+        if self.smtp_login:
+            server.login(self.settings["sender_email"], self.settings["sender_password"])
+        return server
 
 # Singleton instance
-notification_manager = NotificationManager() 
\ No newline at end of file
+notification_manager = NotificationManager()
+atexit.register(notification_manager.dispatcher.stop)
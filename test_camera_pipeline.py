@@ -0,0 +1,39 @@
+import pytest
+
+from ui.camera_pipeline import RecognitionScheduler
+
+
+def test_idle_interval_without_face():
+    scheduler = RecognitionScheduler(idle_interval=0.4)
+    for state in ('waiting', 'detecting', 'failed'):
+        assert scheduler.next_interval(0.05, state, face_present=False) == 0.4
+
+
+def test_idle_interval_is_not_shorter_than_latency():
+    scheduler = RecognitionScheduler(idle_interval=0.4)
+    assert scheduler.next_interval(0.6, 'waiting', face_present=False) == 0.6
+
+
+def test_face_present_runs_at_max_duty():
+    scheduler = RecognitionScheduler(min_interval=0.033, max_duty=0.5)
+    assert scheduler.next_interval(0.1, 'detecting', face_present=True) == pytest.approx(0.2)
+
+    # Szybkie rozpoznanie - nie częściej niż min_interval
+    fast = RecognitionScheduler(min_interval=0.033, max_duty=0.5)
+    assert fast.next_interval(0.005, 'waiting', face_present=True) == 0.033
+
+
+def test_paused_only_when_verified():
+    scheduler = RecognitionScheduler()
+    assert scheduler.paused('verified')
+    for state in ('waiting', 'detecting', 'failed'):
+        assert not scheduler.paused(state)
+
+
+def test_latency_is_smoothed():
+    scheduler = RecognitionScheduler(min_interval=0.0, max_duty=1.0, smoothing=0.25)
+    assert scheduler.next_interval(0.1, 'detecting', True) == pytest.approx(0.1)
+    # EMA: 0.1 + 0.25 * (0.5 - 0.1) = 0.2
+    assert scheduler.next_interval(0.5, 'detecting', True) == pytest.approx(0.2)
+    assert scheduler.latency == pytest.approx(0.2)
+    assert scheduler.next_interval(0.2, 'detecting', True) == pytest.approx(0.2)
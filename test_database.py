@@ -0,0 +1,142 @@
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+import database.db as db_module
+from database.gallery import embedding_gallery
+from database.migrations import SCHEMA_VERSION, get_schema_version
+from database.snapshot_store import snapshot_store
+from database.user_cache import user_cache
+
+
+@pytest.fixture
+def user_model(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_module, 'DB_PATH', tmp_path / 'test.db')
+    monkeypatch.setattr(snapshot_store, 'root', tmp_path / 'snapshots')
+    embedding_gallery.invalidate()
+    user_cache.invalidate()
+
+    from database.models import UserModel
+    model = UserModel()
+    admin_id = model.add_user('admin', np.ones(512, dtype=np.float32), role='ADMIN')
+    for i in range(20):
+        user_id = model.add_user(f'user{i}', np.random.rand(512).astype(np.float32))
+        model.add_embedding(user_id, np.random.rand(512).astype(np.float32))
+        model.log_event(user_id, 'success', confidence=0.9)
+        model.log_unauthorized_access(None, 0.3)
+    model.log_event(admin_id, 'failed', confidence=0.2)
+    model.db.flush()
+    model.db.get_conn().execute('ANALYZE')
+    yield model
+    embedding_gallery.invalidate()
+    user_cache.invalidate()
+
+
+def capture_queries(model, call):
+    """Zwraca zapytania SELECT wykonane przez wywołanie (z podstawionymi parametrami)"""
+    queries = []
+    conn = model.db.get_conn()
+    conn.set_trace_callback(queries.append)
+    try:
+        call()
+    finally:
+        conn.set_trace_callback(None)
+    return [q for q in queries if q.lstrip().upper().startswith('SELECT')]
+
+
+def query_plan(model, query):
+    rows = model.db.get_conn().execute(f'EXPLAIN QUERY PLAN {query}').fetchall()
+    return ' | '.join(row[-1] for row in rows)
+
+
+def test_schema_is_at_latest_version(user_model):
+    assert get_schema_version(user_model.db.get_conn()) == SCHEMA_VERSION
+
+
+@pytest.mark.parametrize('call, index', [
+    (lambda m: m.get_access_logs(), 'idx_logs_status_timestamp'),
+    (lambda m: m.get_access_logs_page(('2100-01-01', 10 ** 9), 10), 'idx_logs_status_timestamp'),
+    (lambda m: m.get_unauthorized_attempts(), 'idx_unauthorized_timestamp'),
+    (lambda m: m.get_all_users(), 'idx_embeddings_user_id'),
+    (lambda m: m.admin_exists(), 'idx_users_role'),
+    (lambda m: (embedding_gallery.invalidate(), m.get_gallery()), 'idx_embeddings_user_id'),
+    (lambda m: m.snapshot_referenced('0' * 64), 'idx_logs_image_ref'),
+    (lambda m: m.snapshot_referenced('0' * 64), 'idx_unauthorized_image_ref'),
+])
+def test_user_model_queries_use_indexes(user_model, call, index):
+    queries = capture_queries(user_model, lambda: call(user_model))
+    assert queries
+    for query in queries:
+        plan = query_plan(user_model, query)
+        assert index in plan, plan
+        assert 'TEMP B-TREE FOR ORDER BY' not in plan, plan
+
+
+def test_database_uses_wal(user_model):
+    assert user_model.db.get_conn().execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+
+def test_log_events_are_batched(user_model):
+    before = user_model.db.get_conn().execute('SELECT COUNT(*) FROM Logs').fetchone()[0]
+    for _ in range(50):
+        user_model.log_event(1, 'success', confidence=0.8)
+    user_model.db.flush()
+    after = user_model.db.get_conn().execute('SELECT COUNT(*) FROM Logs').fetchone()[0]
+    assert after - before == 50
+
+
+def test_event_sink_writes_events_in_background(user_model):
+    from database.event_sink import EventSink
+    sink = EventSink(user_model)
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+    saved = []
+
+    sink.log_auth_event(1, frame, 0.9)
+    sink.log_unauthorized_access(frame, 0.2, on_saved=saved.append)
+    sink.close()
+
+    conn = user_model.db.get_conn()
+    assert conn.execute('SELECT COUNT(*) FROM Logs WHERE image_ref IS NOT NULL').fetchone()[0] == 1
+    assert conn.execute('SELECT COUNT(*) FROM UnauthorizedAccess WHERE image_ref IS NOT NULL').fetchone()[0] == 1
+    assert len(saved) == 1 and snapshot_store.root in Path(saved[0]).parents
+
+
+def test_get_user_is_served_from_cache(user_model):
+    user_model.get_user(2)
+    queries = capture_queries(user_model, lambda: [user_model.get_user(i) for i in range(1, 22)])
+    assert queries == []
+
+    assert user_model.update_user(2, name='renamed')
+    assert user_model.get_user(2)[1] == 'renamed'
+    assert set(user_model.get_users([1, 2, 999])) == {1, 2}
+
+    assert user_model.delete_user(2)
+    assert user_model.get_user(2) is None
+
+
+def test_unreferenced_snapshots_are_collected(user_model):
+    def jpeg(value):
+        return cv2.imencode('.jpg', np.full((16, 16, 3), value, dtype=np.uint8))[1].tobytes()
+
+    user_id = user_model.get_all_users()[0][0]
+    user_model.log_event(user_id, 'success', image=jpeg(10), confidence=0.9)
+    user_model.log_unauthorized_access(jpeg(200), 0.2)
+    user_model.log_unauthorized_access(jpeg(250), 0.1)
+    user_model.db.flush()
+    (kept_id, _, kept_ref, _), (deleted_id, _, deleted_ref, _) = user_model.get_unauthorized_attempts(2)
+    log_ref = snapshot_store.put(jpeg(10))
+
+    # Pliki młodsze niż okres karencji zostają, nawet bez odwołań
+    assert user_model.clear_logs()
+    assert snapshot_store.path(log_ref).exists()
+
+    assert user_model.collect_snapshot_garbage(grace_period=0) == 1
+    assert not snapshot_store.path(log_ref).exists()
+    assert not snapshot_store.thumbnail_path(log_ref).exists()
+    assert snapshot_store.path(kept_ref).exists() and snapshot_store.path(deleted_ref).exists()
+
+    assert user_model.delete_unauthorized_attempt(deleted_id)
+    assert not snapshot_store.path(deleted_ref).exists()
+    assert snapshot_store.load(kept_ref) is not None
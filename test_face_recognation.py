@@ -0,0 +1,80 @@
+import numpy as np
+
+from database.gallery import EMBEDDING_DIM, GallerySnapshot, normalize_rows
+from face_recognition.detector import FaceDetector, face_size_range
+from face_recognition.index import BruteForceIndex, IVFIndex
+
+
+def test_face_size_follows_delivered_frame_width():
+    detector = FaceDetector(auto_face_size=True)
+    # Kamera zignorowała żądane 800 px i zwraca 640x480
+    detector.detect(np.zeros((480, 640, 3), dtype=np.uint8))
+    assert (detector.min_face_size, detector.max_face_size) == face_size_range(640)
+    assert detector.min_face_size < face_size_range(800)[0]
+
+    detector.detect(np.zeros((450, 800, 3), dtype=np.uint8))
+    assert (detector.min_face_size, detector.max_face_size) == face_size_range(800)
+
+
+def test_explicit_face_size_is_kept():
+    detector = FaceDetector(auto_face_size=True, min_face_size=30, max_face_size=300)
+    detector.detect(np.zeros((480, 640, 3), dtype=np.uint8))
+    assert (detector.min_face_size, detector.max_face_size) == (30, 300)
+
+
+def make_gallery(n_users=300, per_user=5, seed=0):
+    rng = np.random.default_rng(seed)
+    user_ids = np.repeat(np.arange(1, n_users + 1), per_user)
+    matrix = normalize_rows(rng.standard_normal((len(user_ids), EMBEDDING_DIM)).astype(np.float32))
+    return GallerySnapshot(user_ids, np.arange(1, len(user_ids) + 1), matrix)
+
+
+def trained_index(gallery, **options):
+    index = IVFIndex(min_train_size=500, **options)
+    index.sync(gallery)
+    # Trening działa w tle - do tego czasu wyniki są dokładne
+    assert index.lists is None
+    index.wait()
+    index.sync(gallery)
+    assert index.lists is not None
+    return index
+
+
+def as_dict(result):
+    user_ids, scores = result
+    return dict(zip(user_ids.tolist(), scores.tolist()))
+
+
+def test_ivf_full_probe_matches_brute_force():
+    gallery = make_gallery()
+    index = trained_index(gallery, n_lists=16, n_probe=16)
+    exact = BruteForceIndex()
+    exact.sync(gallery)
+
+    for query in gallery.matrix[::97]:
+        expected = as_dict(exact.search(query))
+        found = as_dict(index.search(query))
+        assert found.keys() == expected.keys()
+        assert np.allclose([found[u] for u in expected], list(expected.values()), atol=1e-5)
+
+
+def test_ivf_sync_is_incremental():
+    gallery = make_gallery()
+    index = trained_index(gallery, n_lists=16, n_probe=2)
+    lists = index.lists
+
+    # Nowa próbka trafia do list bez ponownego treningu
+    embedding = np.random.default_rng(1).standard_normal(EMBEDDING_DIM)
+    added = gallery.with_row(1000, 10000, embedding)
+    index.sync(added)
+    assert index.lists is lists and index.lists.trained_size == len(gallery)
+    user_ids, scores = index.search(added.matrix[added.embedding_ids == 10000][0])
+    assert user_ids[np.argmax(scores)] == 1000 and np.isclose(scores.max(), 1.0)
+
+    # Usunięcie użytkownika również jest nanoszone przyrostowo
+    keep = added.user_ids != 1000
+    removed = GallerySnapshot(added.user_ids[keep], added.embedding_ids[keep], added.matrix[keep])
+    index.sync(removed)
+    assert index.lists is lists and index.thread is not None and not index.thread.is_alive()
+    assert 1000 not in as_dict(index.search(embedding / np.linalg.norm(embedding)))
+    assert len(index.lists.indexed_ids) == len(removed)
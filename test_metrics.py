@@ -0,0 +1,185 @@
+import threading
+import time
+
+import numpy as np
+
+from metrics.aggregates import WindowedStats
+from metrics.collector import MetricsCollector, PIPELINE_STAGES, RingBuffer, StageTimer
+from metrics.store import MetricsStore
+
+
+def test_ring_buffer_window_after_wraparound():
+    buffer = RingBuffer(8, value=np.int64)
+    for i in range(20):
+        buffer.append(float(i), value=i)
+
+    times, columns = buffer.window()
+    assert list(times) == list(range(12, 20))
+    assert list(columns['value']) == list(range(12, 20))
+
+    times, columns = buffer.window(since=15.5)
+    assert list(columns['value']) == [16, 17, 18, 19]
+    assert len(buffer.window(since=100)[0]) == 0
+
+
+def test_readers_see_consistent_snapshots_while_writing():
+    collector = MetricsCollector(max_samples=64)
+    stop = threading.Event()
+
+    def writer():
+        while not stop.is_set():
+            collector.log_auth_attempt(True, 0.5)
+            collector.log_auth_attempt(False, 0.5)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        for _ in range(500):
+            stats = collector.get_current_stats()
+            assert stats['successful_auths'] + stats['failed_auths'] == stats['total_attempts']
+            scores = collector.get_confidence_distribution(hours=None)
+            assert np.all(scores == 0.5)
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_accuracy_over_time():
+    collector = MetricsCollector()
+    for success in (True, True, True, False):
+        collector.log_auth_attempt(success, 0.9)
+
+    # Jeden przedział obejmujący wszystkie próby
+    times, accuracies = collector.get_accuracy_over_time(hours=1, interval=10 ** 10)
+    assert len(times) == 1
+    assert accuracies[0] == 75
+
+
+def test_snapshot_aggregates():
+    collector = MetricsCollector()
+    before = collector.get_snapshot()
+    for i in range(1, 101):
+        collector.log_auth_attempt(i % 2 == 0, i / 100, detection_time=i / 10)
+
+    snapshot = collector.get_snapshot()
+    assert before.total_attempts == 0 and snapshot is not before
+    assert snapshot.total_attempts == 100 and snapshot.successful_auths == 50
+
+    for stats in (snapshot.recent['detection_time'], snapshot.session['detection_time']):
+        assert stats.count == 100
+        assert np.isclose(stats.mean, 5.05)
+        assert stats.min == 0.1 and stats.max == 10.0
+        assert abs(stats.p50 - 5.0) < 0.5
+        assert abs(stats.p95 - 9.5) < 0.5
+
+
+def test_store_rollups_and_retention(tmp_path):
+    store = MetricsStore(tmp_path / 'metrics.db', max_delay=0.01)
+    now = time.time() // 3600 * 3600
+    try:
+        # Dwie próbki w jednej minucie, jedna w następnej godzinie, jedna sprzed dwóch dni
+        store.record('confidence', 0.2, now - 30)
+        store.record('confidence', 0.6, now - 20)
+        store.record('confidence', 1.0, now + 3600)
+        store.record('confidence', 0.5, now - 2 * 24 * 3600)
+        store.flush()
+
+        buckets, counts, means, mins, maxs = store.rollups('confidence', now - 60, now + 7200, resolution=60)
+        assert list(counts) == [2, 1]
+        assert np.allclose(means, [0.4, 1.0])
+        assert list(mins) == [0.2, 1.0] and list(maxs) == [0.6, 1.0]
+
+        _, counts, _, _, _ = store.rollups('confidence', now - 3 * 24 * 3600, now + 7200)
+        assert counts.sum() == 4 and len(counts) == 3  # zakres > 12h - agregaty godzinowe
+
+        store.prune(now)
+        ts, values = store.samples('confidence', 0, now + 7200)
+        assert list(values) == [0.2, 0.6, 1.0]
+        # Agregaty minutowe i godzinowe mają dłuższą retencję niż surowe próbki
+        assert store.rollups('confidence', 0, now, resolution=60)[1].sum() == 3
+    finally:
+        store.close()
+
+
+def test_collector_feeds_store(tmp_path):
+    store = MetricsStore(tmp_path / 'metrics.db', max_delay=0.01)
+    collector = MetricsCollector(store=store)
+    try:
+        collector.log_auth_attempt(True, 0.9, detection_time=0.1)
+        collector.log_auth_attempt(False, 0.3)
+        collector.log_face_quality(80)
+        store.flush()
+
+        since = time.time() - 3600
+        assert store.rollups('auth_success', since)[2].tolist() == [0.5]
+        assert store.rollups('confidence', since)[1].sum() == 2
+        assert store.rollups('detection_time', since)[1].sum() == 1
+        assert store.rollups('face_quality', since)[3].tolist() == [80.0]
+    finally:
+        store.close()
+
+
+def test_stage_timings():
+    collector = MetricsCollector(publish_interval=0)
+    timer = StageTimer()
+    with timer.stage('matching'):
+        time.sleep(0.01)
+    timer.add('matching', 0.005)
+    timer.add('detect', 0.02)
+
+    collector.log_stage_timings(timer.timings)
+    collector.log_stage_timings({'detect': 0.04})
+    # Czasy trafiają do bufora bez blokady i są scalane dopiero przy publikacji
+    assert len(collector.pending_stages) == 2
+
+    stages = collector.get_snapshot().stages
+    assert not collector.pending_stages
+    assert set(stages) == set(PIPELINE_STAGES)
+    assert stages['detect'].count == 2 and np.isclose(stages['detect'].mean, 0.03)
+    assert stages['matching'].count == 1 and stages['matching'].mean >= 0.015
+    assert stages['inference'].count == 0
+
+
+def test_windowed_stats_running_totals_expire():
+    stats = WindowedStats(np.linspace(0, 10, 11), minutes=3)
+    start = 600 * 60.0
+    for minute, value in enumerate([1.0, 9.0, 5.0, 3.0]):
+        stats.add(start + minute * 60, value)
+
+    # Okno 3 minut: minuta z wartością 1.0 już wypadła
+    snapshot = stats.snapshot(start + 3 * 60)
+    assert snapshot.count == 3 and np.isclose(snapshot.mean, 17 / 3)
+    assert snapshot.min == 3.0 and snapshot.max == 9.0
+    assert stats.snapshot(start + 3 * 60, minutes=2).count == 2
+
+    # Bez nowych próbek okno przesuwa się razem z czasem odczytu
+    assert stats.snapshot(start + 5 * 60).count == 1
+    assert stats.snapshot(start + 5 * 60).max == 3.0
+    assert stats.snapshot(start + 6 * 60).count == 0
+    assert stats.count == 0 and not stats.histogram.any()
+
+
+def test_snapshot_is_refreshed_when_stale():
+    collector = MetricsCollector(publish_interval=0.05)
+    collector.log_auth_attempt(True, 0.9)
+    first = collector.get_snapshot()
+    assert collector.get_snapshot() is first
+    time.sleep(0.06)
+    refreshed = collector.get_snapshot()
+    assert refreshed is not first and refreshed.published > first.published
+    assert refreshed.total_attempts == 1
+
+
+def test_store_path_is_resolved_lazily(tmp_path, monkeypatch):
+    import metrics.store as store_module
+
+    # Utworzenie magazynu nie tworzy pliku bazy - dopiero pierwszy zapis
+    monkeypatch.setattr(store_module, 'METRICS_DB_PATH', tmp_path / 'lazy.db')
+    store = MetricsStore()
+    try:
+        assert store.thread.is_alive() and not (tmp_path / 'lazy.db').exists()
+        store.record('confidence', 0.5)
+        store.flush()
+        assert (tmp_path / 'lazy.db').exists()
+    finally:
+        store.close()
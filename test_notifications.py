@@ -0,0 +1,146 @@
+import json
+import socket
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+aiosmtpd_controller = pytest.importorskip('aiosmtpd.controller')
+
+from notifications.dispatcher import AlertDispatcher
+from notifications.notification_manager import NotificationManager
+
+
+class Inbox:
+    """Handler aiosmtpd zapamiętujący odebrane wiadomości"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return '250 OK'
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def make_manager(port):
+    # Bez __init__ - nie czytamy config/notification_settings.json i nie tworzymy dispatchera
+    manager = NotificationManager.__new__(NotificationManager)
+    manager.settings = {
+        'email_recipients': ['security@example.com'],
+        'sender_email': 'door@example.com',
+        'sender_password': '',
+    }
+    manager.smtp_server = '127.0.0.1'
+    manager.smtp_port = port
+    manager.smtp_use_tls = False
+    manager.smtp_login = False
+    return manager
+
+
+@pytest.fixture
+def image_path(tmp_path):
+    path = tmp_path / 'intruder.jpg'
+    cv2.imwrite(str(path), np.zeros((32, 32, 3), dtype=np.uint8))
+    return path
+
+
+def test_outbox_survives_server_outage(tmp_path, image_path):
+    port = free_port()
+    outbox = tmp_path / 'outbox.jsonl'
+    dispatcher = AlertDispatcher(make_manager(port), outbox_path=outbox, base_backoff=0.05, max_backoff=0.2)
+    inbox = Inbox()
+    controller = aiosmtpd_controller.Controller(inbox, hostname='127.0.0.1', port=port)
+    try:
+        # Serwer wyłączony - alert zostaje w skrzynce i jest ponawiany z opóźnieniem
+        assert dispatcher.enqueue(image_path, 0.42)
+        assert wait_for(lambda: dispatcher.pending[0]['attempts'] >= 2)
+        saved = [json.loads(line) for line in outbox.read_text(encoding='utf-8').splitlines()]
+        assert len(saved) == 1 and saved[0]['confidence'] == 0.42
+
+        # Nowy dispatcher wczytuje niewysłany alert z pliku
+        assert AlertDispatcher(make_manager(port), outbox_path=outbox).pending_count() == 1
+
+        controller.start()
+        assert wait_for(lambda: dispatcher.pending_count() == 0)
+        assert len(inbox.messages) == 1
+        assert inbox.messages[0].rcpt_tos == ['security@example.com']
+        assert outbox.read_text(encoding='utf-8') == ''
+    finally:
+        dispatcher.stop()
+        if controller.loop.is_running():
+            controller.stop()
+
+
+def test_backoff_and_max_attempts(tmp_path, image_path):
+    dispatcher = AlertDispatcher(make_manager(free_port()), outbox_path=tmp_path / 'outbox.jsonl',
+                                 max_attempts=3, base_backoff=0.1, max_backoff=1.0)
+    try:
+        dispatcher.enqueue(image_path, 0.3)
+        assert wait_for(lambda: dispatcher.pending[0]['attempts'] >= 1)
+        # Po pierwszym błędzie następna próba dopiero po base_backoff
+        first_retry = dispatcher.pending[0]['next_attempt'] - time.time()
+        assert 0 < first_retry <= 0.1
+        # Po max_attempts nieudanych próbach alert jest porzucany
+        assert wait_for(lambda: dispatcher.pending_count() == 0)
+    finally:
+        dispatcher.stop()
+
+
+def test_rate_limit(tmp_path, image_path):
+    port = free_port()
+    inbox = Inbox()
+    controller = aiosmtpd_controller.Controller(inbox, hostname='127.0.0.1', port=port)
+    controller.start()
+    dispatcher = AlertDispatcher(make_manager(port), outbox_path=tmp_path / 'outbox.jsonl', max_per_minute=2)
+    try:
+        for i in range(4):
+            dispatcher.enqueue(image_path, 0.1 * i)
+        assert wait_for(lambda: len(inbox.messages) == 2)
+        time.sleep(0.5)
+        # Pozostałe czekają na zwolnienie limitu w oknie 60 s
+        assert len(inbox.messages) == 2
+        assert dispatcher.pending_count() == 2
+    finally:
+        dispatcher.stop()
+        controller.stop()
+
+
+def test_alert_keeps_its_own_copy_of_the_image(tmp_path, image_path):
+    port = free_port()
+    inbox = Inbox()
+    controller = aiosmtpd_controller.Controller(inbox, hostname='127.0.0.1', port=port)
+    dispatcher = AlertDispatcher(make_manager(port), outbox_path=tmp_path / 'outbox' / 'notifications.jsonl',
+                                 base_backoff=0.05, max_backoff=0.2)
+    try:
+        dispatcher.enqueue(image_path, 0.5)
+        attachment = Path(dispatcher.pending[0]['image_path'])
+        assert attachment.parent == tmp_path / 'outbox' / 'attachments' and attachment.exists()
+        # Wpis (i zdjęcie w magazynie) usunięty, zanim alert został wysłany
+        image_path.unlink()
+        assert wait_for(lambda: dispatcher.pending[0]['attempts'] >= 1)
+
+        controller.start()
+        assert wait_for(lambda: dispatcher.pending_count() == 0)
+        assert len(inbox.messages) == 1
+        assert not attachment.exists()
+    finally:
+        dispatcher.stop()
+        if controller.loop.is_running():
+            controller.stop()
@@ -0,0 +1,105 @@
+from collections import OrderedDict
+from datetime import datetime
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QSize
+from PyQt5.QtGui import QPixmap
+from database.snapshot_store import snapshot_store
+
+THUMB_HEIGHT = 120
+
+
+class AccessLogsModel(QAbstractTableModel):
+    """
+    Model historii logowań ładowany stronami (keyset pagination po (timestamp, id)).
+    Widok pobiera kolejne strony przez canFetchMore/fetchMore w trakcie przewijania,
+    a miniatury są dekodowane dopiero gdy wiersz staje się widoczny.
+    """
+
+    COLUMNS = ['Zdjęcie', 'Data i czas', 'Użytkownik', 'Pewność']
+
+    def __init__(self, user_model, page_size=200, thumb_cache_size=300, parent=None):
+        super().__init__(parent)
+        self.user_model = user_model
+        self.page_size = page_size
+        self.thumb_cache_size = thumb_cache_size
+        self.rows = []
+        self.has_more = True
+        self.thumb_cache = OrderedDict()  # image_ref -> QPixmap (LRU)
+
+    def refresh(self):
+        """Ładuje od nowa pierwszą stronę"""
+        self.beginResetModel()
+        self.rows = []
+        self.has_more = True
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self.has_more:
+            return
+        before = None
+        if self.rows:
+            last = self.rows[-1]
+            before = (last[1], last[0])
+        page = self.user_model.get_access_logs_page(before, self.page_size)
+        self.has_more = len(page) == self.page_size
+        if not page:
+            return
+        self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(page) - 1)
+        self.rows.extend(page)
+        self.endInsertRows()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        log_id, timestamp, user_id, username, status, image_ref, confidence = self.rows[index.row()]
+        column = index.column()
+
+        if column == 0:
+            if role == Qt.DecorationRole:
+                return self.thumbnail(image_ref)
+            if role == Qt.SizeHintRole:
+                return QSize(THUMB_HEIGHT * 16 // 9, THUMB_HEIGHT)
+            return None
+
+        if role == Qt.DisplayRole:
+            if column == 1:
+                return datetime.fromisoformat(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+            if column == 2:
+                return username
+            if column == 3:
+                return f"{confidence * 100:.2f}%" if confidence is not None else "N/A"
+        elif role == Qt.TextAlignmentRole:
+            return int(Qt.AlignLeft | Qt.AlignVCenter)
+        return None
+
+    def thumbnail(self, image_ref):
+        """Miniatura z cache LRU; dekodowana tylko dla wierszy, o które pyta widok"""
+        if not image_ref:
+            return None
+        pixmap = self.thumb_cache.get(image_ref)
+        if pixmap is not None:
+            self.thumb_cache.move_to_end(image_ref)
+            return pixmap
+
+        pixmap = QPixmap()
+        thumb_bytes = snapshot_store.load_thumbnail(image_ref)
+        if not thumb_bytes or not pixmap.loadFromData(thumb_bytes):
+            return None
+        self.thumb_cache[image_ref] = pixmap
+        if len(self.thumb_cache) > self.thumb_cache_size:
+            self.thumb_cache.popitem(last=False)
+        return pixmap
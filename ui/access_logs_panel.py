@@ -1,16 +1,17 @@
-import cv2
-import numpy as np
 from datetime import datetime
 import csv
+import itertools
 import os
+import shutil
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QScrollArea, QFrame, QPushButton, QGridLayout, QMessageBox,
-    QFileDialog
+    QPushButton, QMessageBox, QFileDialog, QTableView, QHeaderView, QAbstractItemView
 )
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QImage, QPixmap, QFont
+from PyQt5.QtCore import Qt, QSize
+from PyQt5.QtGui import QFont
 from database.models import UserModel
+from database.snapshot_store import snapshot_store
+from ui.access_logs_model import AccessLogsModel, THUMB_HEIGHT
 
 class AccessLogsPanel(QWidget):
     def __init__(self):
@@ -28,19 +29,45 @@ class AccessLogsPanel(QWidget):
         title.setAlignment(Qt.AlignCenter)
         layout.addWidget(title)
 
-        # Obszar przewijania dla zdarzeń
-        scroll_area = QScrollArea()
-        scroll_area.setWidgetResizable(True)
-        scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        scroll_area.setStyleSheet("QScrollArea { border: none; }")
-
-        # Kontener na zdarzenia
-        self.events_container = QWidget()
-        self.events_layout = QGridLayout()
-        self.events_container.setLayout(self.events_layout)
-        scroll_area.setWidget(self.events_container)
+        # Tabela zdarzeń - model ładuje kolejne strony podczas przewijania
+        self.logs_model = AccessLogsModel(self.user_model)
+        self.events_view = QTableView()
+        self.events_view.setModel(self.logs_model)
+        self.events_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.events_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.events_view.setIconSize(QSize(THUMB_HEIGHT * 16 // 9, THUMB_HEIGHT))
+        self.events_view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+
+        # Stała wysokość wierszy - widok nie musi mierzyć każdego wiersza
+        vertical_header = self.events_view.verticalHeader()
+        vertical_header.setVisible(False)
+        vertical_header.setSectionResizeMode(QHeaderView.Fixed)
+        vertical_header.setDefaultSectionSize(THUMB_HEIGHT + 10)
+
+        header = self.events_view.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.Fixed)
+        header.resizeSection(0, THUMB_HEIGHT * 16 // 9 + 10)
+        header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(2, QHeaderView.Stretch)
+        header.setSectionResizeMode(3, QHeaderView.ResizeToContents)
+
+        self.events_view.setStyleSheet("""
+            QTableView {
+                border: 1px solid #ddd;
+                border-radius: 4px;
+                background-color: white;
+                gridline-color: #eee;
+            }
+            QHeaderView::section {
+                background-color: #f5f5f5;
+                padding: 8px;
+                border: none;
+                border-bottom: 2px solid #ddd;
+                font-weight: bold;
+            }
+        """)
 
-        layout.addWidget(scroll_area)
+        layout.addWidget(self.events_view)
 
         # Panel przycisków
         button_layout = QHBoxLayout()
@@ -85,87 +112,16 @@ class AccessLogsPanel(QWidget):
         self.load_events()
 
     def load_events(self):
-        # Wyczyść istniejące zdarzenia
-        for i in reversed(range(self.events_layout.count())): 
-            self.events_layout.itemAt(i).widget().setParent(None)
-
-        # Pobierz zdarzenia z bazy danych
-        events = self.user_model.get_access_logs()
-
-        # Dodaj zdarzenia do interfejsu
-        for row, (event_id, timestamp, user_id, username, status, image_bytes, confidence) in enumerate(events):
-            # Kontener na pojedyncze zdarzenie
-            event_frame = QFrame()
-            event_frame.setStyleSheet("""
-                QFrame {
-                    border: 1px solid #ddd;
-                    border-radius: 4px;
-                    background-color: white;
-                    margin: 5px;
-                    padding: 10px;
-                }
-            """)
-            event_layout = QHBoxLayout()
-
-            # Konwertuj timestamp na czytelny format
-            dt = datetime.fromisoformat(timestamp)
-            formatted_time = dt.strftime("%Y-%m-%d %H:%M:%S")
-
-            if image_bytes:
-                # Konwertuj obraz z BLOB na QPixmap
-                nparr = np.frombuffer(image_bytes, np.uint8)
-                img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                h, w = img.shape[:2]
-                
-                # Przeskaluj obraz, zachowując proporcje
-                target_height = 120
-                aspect_ratio = w / h
-                target_width = int(target_height * aspect_ratio)
-                
-                img = cv2.resize(img, (target_width, target_height))
-                img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                h, w, ch = img.shape
-                qt_img = QImage(img.data, w, h, ch * w, QImage.Format_RGB888)
-                pixmap = QPixmap.fromImage(qt_img)
-
-                # Dodaj obraz
-                img_label = QLabel()
-                img_label.setPixmap(pixmap)
-                img_label.setFixedSize(target_width, target_height)
-                event_layout.addWidget(img_label)
-
-            # Informacje o zdarzeniu
-            info_layout = QVBoxLayout()
-            
-            time_label = QLabel(f"Data i czas: {formatted_time}")
-            time_label.setStyleSheet("font-weight: bold;")
-            info_layout.addWidget(time_label)
-            
-            user_label = QLabel(f"Użytkownik: {username}")
-            user_label.setStyleSheet("font-weight: bold; color: #2980b9;")
-            info_layout.addWidget(user_label)
-            
-            if confidence is not None:
-                confidence_label = QLabel(f"Pewność: {confidence * 100:.2f}%")
-                confidence_label.setStyleSheet("font-weight: bold; color: #27ae60;")
-                info_layout.addWidget(confidence_label)
-            
-            event_layout.addLayout(info_layout)
-            event_layout.addStretch()
-            
-            event_frame.setLayout(event_layout)
-            self.events_layout.addWidget(event_frame, row, 0)
-
-        # Dodaj elastyczny element na końcu
-        self.events_layout.addWidget(QWidget(), len(events), 0)
-        self.events_layout.setRowStretch(len(events), 1)
+        """Odświeża tabelę - ładuje ponownie pierwszą stronę zdarzeń"""
+        self.logs_model.refresh()
 
     def export_to_csv(self):
         """Eksportuje historię logowań do pliku CSV"""
-        # Pobierz dane do eksportu
-        logs = self.user_model.get_access_logs()
-        
-        if not logs:
+        # Pobierz dane do eksportu (wszystkie strony, iteracyjnie)
+        logs = self.user_model.iter_access_logs()
+        first_log = next(logs, None)
+
+        if first_log is None:
             QMessageBox.warning(
                 self,
                 "Brak danych",
@@ -199,20 +155,18 @@ class AccessLogsPanel(QWidget):
                                    'Status', 'Pewność', 'Ścieżka do zdjęcia'])
 
                     # Dane
-                    for log in logs:
-                        log_id, timestamp, user_id, username, status, image_bytes, confidence = log
+                    for log in itertools.chain([first_log], logs):
+                        log_id, timestamp, user_id, username, status, image_ref, confidence = log
                         
                         # Zapisz zdjęcie jeśli istnieje
                         image_path = ""
-                        if image_bytes:
+                        if image_ref and snapshot_store.path(image_ref).exists():
                             image_filename = f"log_{log_id}.jpg"
                             image_path = os.path.join("zdjecia_logow", image_filename)
                             full_image_path = os.path.join(images_folder, image_filename)
                             
-                            # Konwertuj i zapisz zdjęcie
-                            nparr = np.frombuffer(image_bytes, np.uint8)
-                            img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                            cv2.imwrite(full_image_path, img)
+                            # Skopiuj zdjęcie (JPEG) z magazynu snapshotów
+                            shutil.copyfile(snapshot_store.path(image_ref), full_image_path)
 
                         # Formatuj pewność
                         if confidence is not None:
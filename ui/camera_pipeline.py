@@ -0,0 +1,149 @@
+import queue
+import time
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from metrics.collector import metrics_collector
+
+
+def put_latest(frame_queue, item):
+    """Wstawia element do ograniczonej kolejki, wyrzucając najstarsze (nieaktualne) klatki"""
+    while True:
+        try:
+            frame_queue.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                frame_queue.get_nowait()
+            except queue.Empty:
+                pass
+
+
+class CaptureThread(QThread):
+    """Wątek odczytu kamery - wyświetlanie działa z FPS kamery niezależnie od rozpoznawania"""
+
+    frame_ready = pyqtSignal(np.ndarray)
+
+    def __init__(self, capture, frame_queue):
+        super().__init__()
+        self.capture = capture
+        self.frame_queue = frame_queue
+        self.running = True
+
+    def run(self):
+        while self.running:
+            # grab() czeka na kolejną klatkę kamery - mierzymy tylko jej dekodowanie (retrieve)
+            if not self.capture.grab():
+                self.msleep(5)
+                continue
+            started = time.perf_counter()
+            ret, frame = self.capture.retrieve()
+            if not ret:
+                self.msleep(5)
+                continue
+            metrics_collector.log_stage_timings({'capture': time.perf_counter() - started})
+            put_latest(self.frame_queue, frame)
+            self.frame_ready.emit(frame)
+
+    def stop(self):
+        self.running = False
+        self.wait()
+
+
+class RecognitionScheduler:
+    """
+    Dobiera odstęp między kolejnymi rozpoznaniami niezależnie od FPS kamery:
+    - brak twarzy w kadrze (w każdym stanie, także failed/detecting) - rzadko,
+      co idle_interval sekund,
+    - twarz w kadrze - tak często, jak pozwala zmierzony czas rozpoznania,
+      ograniczony do max_duty czasu procesora (i nie częściej niż min_interval),
+    - verified - wstrzymane do czasu zresetowania stanu.
+    """
+
+    def __init__(self, idle_interval=0.4, min_interval=0.033, max_duty=0.5, smoothing=0.2):
+        self.idle_interval = idle_interval
+        self.min_interval = min_interval
+        self.max_duty = max_duty
+        self.smoothing = smoothing
+        self.latency = None  # średnia krocząca (EMA) czasu rozpoznania w sekundach
+
+    def paused(self, auth_state):
+        return auth_state == "verified"
+
+    def next_interval(self, latency, auth_state, face_present):
+        """Zwraca odstęp (start-start) do następnego rozpoznania w sekundach"""
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.smoothing * (latency - self.latency)
+
+        if not face_present:
+            return max(self.idle_interval, self.latency)
+        return max(self.min_interval, self.latency / self.max_duty)
+
+
+class RecognitionWorker(QThread):
+    """
+    Wątek detekcji/embeddingu - przetwarza najnowszą dostępną klatkę
+    w tempie wyznaczanym przez RecognitionScheduler
+    """
+
+    result_ready = pyqtSignal(object, dict)  # (overlay, metrics)
+
+    def __init__(self, auth_manager, frame_queue, scheduler=None):
+        super().__init__()
+        self.auth_manager = auth_manager
+        self.frame_queue = frame_queue
+        self.scheduler = scheduler or RecognitionScheduler()
+        self.running = True
+
+    def run(self):
+        next_due = 0.0
+        while self.running:
+            delay = next_due - time.monotonic()
+            if delay > 0:
+                self.msleep(max(1, int(min(delay, 0.1) * 1000)))
+                continue
+            if self.scheduler.paused(self.auth_manager.auth_state):
+                self.msleep(100)
+                continue
+            try:
+                frame = self.frame_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            started = time.monotonic()
+            try:
+                overlay, metrics = self.auth_manager.analyze_frame(frame)
+            except Exception as e:
+                print(f"Error processing frame: {e}")
+                continue
+            next_due = started + self.scheduler.next_interval(
+                time.monotonic() - started,
+                self.auth_manager.auth_state,
+                not overlay["guide"]
+            )
+            self.result_ready.emit(overlay, metrics)
+
+    def stop(self):
+        self.running = False
+        self.wait()
+
+
+class CameraPipeline:
+    """Kamera -> ograniczona kolejka -> wątek rozpoznawania -> sygnały do GUI"""
+
+    def __init__(self, capture, auth_manager, queue_size=1):
+        self.frame_queue = queue.Queue(maxsize=queue_size)
+        self.capture_thread = CaptureThread(capture, self.frame_queue)
+        self.worker = RecognitionWorker(auth_manager, self.frame_queue)
+        self.frame_ready = self.capture_thread.frame_ready
+        self.result_ready = self.worker.result_ready
+
+    def start(self):
+        self.worker.start()
+        self.capture_thread.start()
+
+    def stop(self):
+        self.capture_thread.stop()
+        self.worker.stop()
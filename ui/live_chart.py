@@ -0,0 +1,61 @@
+class LiveLineChart:
+    """
+    Wykres liniowy z trwałymi osiami i linią aktualizowaną przez set_data.
+    Po pełnym rysowaniu zapamiętywane jest tło osi, a kolejne aktualizacje
+    rysują tylko linię (blitting). Pełne przerysowanie następuje jedynie przy
+    zmianie zakresu osi Y, pokazaniu/ukryciu napisu "Brak danych" lub zmianie
+    rozmiaru okna. Aktualizacja bez zmiany danych jest pomijana.
+    """
+
+    def __init__(self, figure, canvas, title, ylabel, style, ylim=None, window=60):
+        self.figure = figure
+        self.canvas = canvas
+        self.fixed_ylim = ylim
+
+        self.ax = figure.add_subplot(111)
+        self.line, = self.ax.plot([], [], style, linewidth=2, animated=True)
+        self.ax.set_xlim(-window + 1, 0)
+        self.ax.set_ylim(*(ylim or (0, 1)))
+        self.ax.set_xlabel('Sekundy temu')
+        self.ax.set_ylabel(ylabel)
+        self.ax.grid(True, alpha=0.3)
+        self.empty_text = self.ax.text(0.5, 0.5, 'Brak danych', ha='center', va='center',
+                                       transform=self.ax.transAxes)
+        figure.suptitle(title, fontsize=10)
+        figure.tight_layout()
+
+        self.background = None
+        self.last_values = None
+        canvas.mpl_connect('draw_event', self.on_draw)
+
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.line)
+
+    def update(self, values):
+        values = tuple(values)
+        if values == self.last_values:
+            return
+        self.last_values = values
+
+        self.line.set_data(range(-len(values) + 1, 1), values)
+
+        full_redraw = self.empty_text.get_visible() != (not values)
+        self.empty_text.set_visible(not values)
+        if self.fixed_ylim is None and values:
+            full_redraw |= self.rescale(max(values))
+
+        if full_redraw or self.background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self.ax.draw_artist(self.line)
+        self.canvas.blit(self.ax.bbox)
+
+    def rescale(self, peak):
+        """Dopasowuje oś Y, gdy wartości wychodzą poza zakres lub są dużo mniejsze"""
+        bottom, top = self.ax.get_ylim()
+        if peak <= top and peak >= top / 4:
+            return False
+        self.ax.set_ylim(0, max(peak * 1.25, 1e-3))
+        return True
@@ -3,7 +3,6 @@ import cv2
 import numpy as np
 import time
 from datetime import datetime, timedelta
-from pathlib import Path
 from PyQt5.QtWidgets import (
     QMainWindow, QApplication, QPushButton, QLabel,
     QVBoxLayout, QWidget, QHBoxLayout, QMessageBox,
@@ -12,21 +11,25 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import QTimer, Qt
 from PyQt5.QtGui import QImage, QPixmap, QFont, QPainter, QPen
 
-from face_recognition.detector import FaceDetector
+from face_recognition.detector import create_detector
 from face_recognition.embedder import FaceEmbedder
 from face_recognition.matcher import FaceMatcher
+from face_recognition.embedding_cache import FaceResultCache
 from database.models import UserModel
-from utils.image_utils import preprocess_face
-from ui.admin_registration import AdminRegistration
-from ui.admin_panel import AdminPanel
+from database.event_sink import event_sink
+from utils.image_utils import preprocess_faces
 from ui.user_panel import UserPanel
-from metrics.collector import metrics_collector
+from ui.camera_pipeline import CameraPipeline
+from ui.model_loader import ModelWarmupThread
+from metrics.collector import metrics_collector, StageTimer
 from notifications.notification_manager import notification_manager
 
 # Constants for application
 AUTH_REQUIRED_TIME = 3.0  # seconds
 LOG_THROTTLE_TIME = 60  # seconds
 UNAUTHORIZED_DETECTION_TIME = 10.0  # seconds
+FRAME_WIDTH, FRAME_HEIGHT = 800, 450
+DETECTION_SCALE = 0.5  # full-frame face detection runs at half resolution
 
 class FaceMetricsPanel(QFrame):
     """Panel displaying real-time face detection metrics"""
@@ -112,12 +115,17 @@ class FaceAuthManager:
         self.matcher = matcher
         self.user_model = user_model
 
+        # Reuse of embeddings/scores while the face crop stays the same
+        # (forced FaceNet refresh every 10 frames)
+        self.face_cache = FaceResultCache(refresh_every=10)
+
         # Authentication state
         self.auth_state = "waiting"  # waiting, detecting, verified, failed
         self.detection_start_time = 0
         self.continuous_detection_time = 0
         self.required_detection_time = AUTH_REQUIRED_TIME
         self.current_user_id = None
+        self.current_user_name = "Unknown"
         self.current_score = 0.0
         self.face_dims = (0, 0)
 
@@ -128,10 +136,6 @@ class FaceAuthManager:
         self.unauthorized_detection_start = 0
         self.unauthorized_frame = None
         self.unauthorized_score = 0.0
-        
-        # Ścieżka do zapisu zdjęć nieautoryzowanych prób
-        self.unauthorized_dir = Path("unauthorized_attempts")
-        self.unauthorized_dir.mkdir(exist_ok=True)
 
     def reset_auth_state(self):
         """Reset the authentication state"""
@@ -139,20 +143,39 @@ class FaceAuthManager:
         self.detection_start_time = 0
         self.continuous_detection_time = 0
         self.current_user_id = None
+        self.current_user_name = "Unknown"
         self.current_score = 0.0
         self.face_dims = (0, 0)
         self.unauthorized_detection_start = 0
         self.unauthorized_frame = None
         self.unauthorized_score = 0.0
+        self.face_cache.reset()
 
     def process_frame(self, frame):
         """Process a video frame for face authentication"""
         if frame is None:
             return None, {}
 
+        overlay, metrics = self.analyze_frame(frame)
+
         # Create a copy for display
+        started = time.perf_counter()
         display_frame = frame.copy()
+        self.draw_overlay(display_frame, overlay)
+        metrics_collector.log_stage_timings({'render': time.perf_counter() - started})
+        return display_frame, metrics
+
+    def analyze_frame(self, frame):
+        """Run detection, matching and the authentication state machine on a frame.
+
+        Returns a drawing description (see draw_overlay) instead of an annotated
+        frame, so that recognition can run on a worker thread while the GUI
+        draws the latest overlay on every camera frame.
+        """
         current_time = time.time()
+        overlay = {"guide": False, "primary": None, "others": []}
+        # Czasy etapów tej klatki (perf_counter) - trafiają do histogramów w metrics_collector
+        timer = StageTimer()
 
         # Prepare metrics
         metrics = {
@@ -166,6 +189,8 @@ class FaceAuthManager:
 
         # Detect faces
         faces = self.detector.detect_faces(frame)
+        for stage, seconds in self.detector.last_timings.items():
+            timer.add(stage, seconds)
 
         # Reset unauthorized tracking if no face detected
         if len(faces) == 0:
@@ -180,27 +205,30 @@ class FaceAuthManager:
                 self.continuous_detection_time = 0
 
             # Draw guidance box in the center when no face is detected
-            h, w = display_frame.shape[:2]
-            center_x, center_y = w // 2, h // 2
-            box_w, box_h = 300, 350
-            cv2.rectangle(display_frame,
-                          (center_x - box_w // 2, center_y - box_h // 2),
-                          (center_x + box_w // 2, center_y + box_h // 2),
-                          (200, 200, 200), 2)
-            cv2.putText(display_frame, "Umiesc twarz w ramce",
-                        (center_x - 150, center_y - box_h // 2 - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (200, 200, 200), 2)
+            overlay["guide"] = True
         else:
-            # Process the first detected face
+            # Faces unchanged since the previous frame reuse their match;
+            # the rest go through FaceNet as a single batch
+            with timer.stage('gallery'):
+                gallery = self.user_model.get_gallery()
+            with timer.stage('matching'):
+                matches = self.face_cache.lookup(frame, faces, gallery)
+            missing = [i for i, match in enumerate(matches) if match is None]
+            if missing:
+                with timer.stage('preprocess'):
+                    face_imgs = [frame[fy:fy + fh, fx:fx + fw] for fx, fy, fw, fh in (faces[i] for i in missing)]
+                    batch = preprocess_faces(face_imgs)
+                with timer.stage('inference'):
+                    embs = self.embedder.get_embeddings(batch)
+                with timer.stage('matching'):
+                    for i, emb in zip(missing, embs):
+                        matches[i] = self.matcher.match_gallery(emb, gallery)
+            self.face_cache.update(matches)
+
+            # The first detected face drives authentication
             x, y, w, h = faces[0]
             self.face_dims = (w, h)
-            face_img = frame[y:y + h, x:x + w]
-
-            # Get embedding and match
-            proc = preprocess_face(face_img)
-            emb = self.embedder.get_embedding(proc)
-            db_embs = self.user_model.get_all_embeddings()
-            user_id, score = self.matcher.match(emb, db_embs)
+            user_id, score = matches[0]
 
             # Update current state
             self.current_score = score
@@ -229,10 +257,12 @@ class FaceAuthManager:
                         if self.continuous_detection_time >= self.required_detection_time:
                             self.auth_state = "verified"
                             if user_id is not None:
-                                user = self.user_model.get_user(user_id)
-                                name = user[1] if user else "Unknown"
-                                metrics["rozpoznano"] = name
-                                self.log_auth_event(user_id)
+                                # Nazwa jest pobierana raz, przy przejściu do stanu "verified"
+                                with timer.stage('db_enqueue'):
+                                    user = self.user_model.get_user(user_id)
+                                    self.current_user_name = user[1] if user else "Unknown"
+                                    self.log_auth_event(user_id)
+                                metrics["rozpoznano"] = self.current_user_name
                             else:
                                 metrics["rozpoznano"] = "Nieznany"
                             metrics_collector.log_auth_attempt(
@@ -257,20 +287,17 @@ class FaceAuthManager:
                     self.unauthorized_frame = frame.copy()
                     self.unauthorized_score = score
                 elif current_time - self.unauthorized_detection_start >= UNAUTHORIZED_DETECTION_TIME:
-                    # Zapisz zdjęcie nieautoryzowanej próby
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    image_path = self.unauthorized_dir / f"unauthorized_{timestamp}.jpg"
-                    cv2.imwrite(str(image_path), self.unauthorized_frame)
-                    
-                    # Zapisz do bazy danych
-                    _, img_encoded = cv2.imencode('.jpg', self.unauthorized_frame)
-                    self.user_model.log_unauthorized_access(img_encoded.tobytes(), self.unauthorized_score)
-                    
-                    # Wyślij powiadomienie email
-                    notification_manager.send_unauthorized_access_notification(
-                        str(image_path),
-                        self.unauthorized_score
-                    )
+                    # Zdjęcie, wpis w bazie i powiadomienie email są zapisywane w tle;
+                    # email dostaje ścieżkę zdjęcia z magazynu snapshotów
+                    unauthorized_score = self.unauthorized_score
+                    with timer.stage('db_enqueue'):
+                        event_sink.log_unauthorized_access(
+                            self.unauthorized_frame,
+                            unauthorized_score,
+                            on_saved=lambda image_path: notification_manager.send_unauthorized_access_notification(
+                                image_path, unauthorized_score
+                            )
+                        )
                     
                     # Reset tracking
                     self.unauthorized_detection_start = 0
@@ -286,7 +313,7 @@ class FaceAuthManager:
                     )
                     self.last_failed_log = now
 
-            # Draw rectangle around face with color based on state
+            # Pick rectangle color and status based on state
             if self.auth_state == "waiting":
                 color = (255, 128, 0)  # Orange
                 metrics["status"] = "Wykrywanie twarzy"
@@ -296,10 +323,8 @@ class FaceAuthManager:
             elif self.auth_state == "verified":
                 if user_id is not None:
                     color = (0, 255, 0)  # Green
-                    user = self.user_model.get_user(user_id)
-                    name = user[1] if user else "Unknown"
-                    metrics["status"] = f"Autoryzowano: {name}"
-                    metrics["rozpoznano"] = name
+                    metrics["status"] = f"Autoryzowano: {self.current_user_name}"
+                    metrics["rozpoznano"] = self.current_user_name
                 else:
                     color = (0, 0, 255)  # Red
                     metrics["status"] = "Nieautoryzowany uzytkownik"
@@ -308,6 +333,44 @@ class FaceAuthManager:
                 color = (0, 0, 255)  # Red
                 metrics["status"] = "Odmowa dostępu"
 
+            # Status text drawn above the face
+            status_text = ""
+            if self.auth_state == "waiting":
+                status_text = "Wykrywanie twarzy..."
+            elif self.auth_state == "detecting":
+                status_text = f"Weryfikacja: {int(self.continuous_detection_time)}/{int(self.required_detection_time)}s"
+            elif self.auth_state == "verified":
+                if user_id is not None:
+                    status_text = f"Zalogowano: {self.current_user_name}"
+                else:
+                    status_text = "Nieautoryzowany uzytkownik"
+            elif self.auth_state == "failed":
+                status_text = "Odmowa dostępu"
+
+            overlay["primary"] = ((x, y, w, h), color, status_text, score)
+            overlay["others"] = [(tuple(int(v) for v in box), face_score) for box, (_, face_score) in zip(faces[1:], matches[1:])]
+
+        metrics_collector.log_stage_timings(timer.timings)
+        return overlay, metrics
+
+    def draw_overlay(self, display_frame, overlay):
+        """Draw the result of analyze_frame onto a display frame (in place)"""
+        if overlay["guide"]:
+            # Draw guidance box in the center when no face is detected
+            h, w = display_frame.shape[:2]
+            center_x, center_y = w // 2, h // 2
+            box_w, box_h = 300, 350
+            cv2.rectangle(display_frame,
+                          (center_x - box_w // 2, center_y - box_h // 2),
+                          (center_x + box_w // 2, center_y + box_h // 2),
+                          (200, 200, 200), 2)
+            cv2.putText(display_frame, "Umiesc twarz w ramce",
+                        (center_x - 150, center_y - box_h // 2 - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (200, 200, 200), 2)
+
+        if overlay["primary"] is not None:
+            (x, y, w, h), color, status_text, score = overlay["primary"]
+
             # Draw rectangle and status
             cv2.rectangle(display_frame, (x, y), (x + w, y + h), color, 2)
 
@@ -330,22 +393,6 @@ class FaceAuthManager:
             cv2.rectangle(display_frame, (x, confidence_y), (x + confidence_width, confidence_y + confidence_height),
                           confidence_color, -1)
 
-            # Status text with background
-            status_text = ""
-            if self.auth_state == "waiting":
-                status_text = "Wykrywanie twarzy..."
-            elif self.auth_state == "detecting":
-                status_text = f"Weryfikacja: {int(self.continuous_detection_time)}/{int(self.required_detection_time)}s"
-            elif self.auth_state == "verified":
-                if user_id is not None:
-                    user = self.user_model.get_user(user_id)
-                    name = user[1] if user else "Unknown"
-                    status_text = f"Zalogowano: {name}"
-                else:
-                    status_text = "Nieautoryzowany uzytkownik"
-            elif self.auth_state == "failed":
-                status_text = "Odmowa dostępu"
-
             # Calculate background rectangle for text
             text_size = cv2.getTextSize(status_text, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
             cv2.rectangle(display_frame, (x, y_offset - 20), (x + text_size[0] + 10, y_offset + 5),
@@ -360,7 +407,11 @@ class FaceAuthManager:
             cv2.putText(display_frame, score_text, (x, confidence_y + 20),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
 
-        return display_frame, metrics
+        # Remaining faces are only marked with their match score
+        for (fx, fy, fw, fh), face_score in overlay["others"]:
+            cv2.rectangle(display_frame, (fx, fy), (fx + fw, fy + fh), (200, 200, 200), 1)
+            cv2.putText(display_frame, f"Pewnosc: {face_score:.2f}", (fx, fy + fh + 15),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
 
     def quality_to_score(self, quality_str):
         """Convert quality string to numeric score (0-100)"""
@@ -380,18 +431,13 @@ class FaceAuthManager:
         # Check if we should log this event (throttle by user_id)
         last_log = self.last_log_time.get(user_id)
         if last_log is None or (current_time - last_log) > timedelta(seconds=LOG_THROTTLE_TIME):
-            # Get current frame and encode it
+            # Kodowanie JPEG i zapis do bazy odbywają się w wątku event_sink
             ret, frame = self.detector.get_current_frame()
-            if ret:
-                _, img_encoded = cv2.imencode('.jpg', frame)
-                self.user_model.log_event(
-                    user_id,
-                    'success',
-                    img_encoded.tobytes(),
-                    self.current_score
-                )
-            else:
-                self.user_model.log_event(user_id, 'success')
+            event_sink.log_auth_event(
+                user_id,
+                frame if ret else None,
+                self.current_score if ret else None
+            )
             self.last_log_time[user_id] = current_time
 
     def estimate_image_quality(self, image):
@@ -423,7 +469,14 @@ class LoginScreen(QMainWindow):
         self.setStyleSheet('background-color: #f0f2f5;')
 
         # Initialize dependencies
-        self.detector = FaceDetector()
+        # Backend i parametry można nadpisać w config/detector_settings.json.
+        # Rozmiar twarzy wynika z szerokości klatek, które kamera faktycznie zwraca
+        # (nie z żądanej FRAME_WIDTH)
+        self.detector = create_detector(
+            tracking=True,
+            detection_scale=DETECTION_SCALE,
+            auto_face_size=True
+        )
         self.embedder = FaceEmbedder()
         self.matcher = FaceMatcher()  # threshold=0.90 is default
         self.user_model = UserModel()
@@ -449,10 +502,10 @@ class LoginScreen(QMainWindow):
         main_layout = QVBoxLayout(self.central_widget)
         main_layout.addWidget(self.stack)
 
-        # Timer and flags
+        # Camera pipeline and flags
         self.capture = None
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_frame)
+        self.pipeline = None
+        self.last_overlay = None
         self.ui_update_timer = QTimer()
         self.ui_update_timer.timeout.connect(self.update_ui_elements)
         self.ui_update_timer.setInterval(100)  # Update UI at 10Hz
@@ -468,6 +521,38 @@ class LoginScreen(QMainWindow):
 
         self.verified_user_id = None
 
+        # FaceNet is loaded and warmed up in the background, the window shows right away
+        self.load_models()
+
+    def load_models(self):
+        """Start (or retry) loading and warming up FaceNet on a background thread"""
+        self.models_ready = False
+        self.set_models_loading(True)
+        self.warmup_thread = ModelWarmupThread(self.embedder)
+        self.warmup_thread.loaded.connect(self.on_models_loaded)
+        self.warmup_thread.failed.connect(self.on_models_failed)
+        self.warmup_thread.start()
+
+    def set_models_loading(self, loading):
+        """Show the "loading models" state and block starting recognition"""
+        self.start_btn.setEnabled(not loading)
+        self.reg_btn.setEnabled(not loading)
+        self.start_btn.setText('Ładowanie modeli...' if loading else 'Rozpocznij wykrywanie twarzy')
+        self.reg_btn.setText('Zarejestruj Admina')
+
+    def on_models_loaded(self, seconds):
+        print(f"Modele załadowane w {seconds:.2f}s")
+        self.models_ready = True
+        self.set_models_loading(False)
+
+    def on_models_failed(self, error):
+        # Przyciski pozostają aktywne - kliknięcie ponawia ładowanie modeli
+        self.start_btn.setEnabled(True)
+        self.reg_btn.setEnabled(True)
+        self.start_btn.setText('Ponów ładowanie modeli')
+        self.reg_btn.setText('Ponów ładowanie')
+        QMessageBox.warning(self, "Błąd", f"Nie można załadować modelu rozpoznawania twarzy:\n{error}")
+
     def init_login_ui(self):
         """Initialize all UI elements for the login screen"""
         # Title and buttons
@@ -614,31 +699,42 @@ class LoginScreen(QMainWindow):
 
     def start_camera(self):
         """Start the camera feed"""
+        if not self.models_ready:
+            self.load_models()
+            return
         if self.capture is None:
             self.capture = cv2.VideoCapture(0)
             if not self.capture.isOpened():
                 QMessageBox.warning(self, "Błąd kamery", "Nie można otworzyć kamery")
                 self.capture = None
                 return
-            self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, 800)
-            self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, 450)
+            self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
+            self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
             self.start_btn.setEnabled(False)
             self.reg_btn.hide() if hasattr(self, 'reg_btn') else None
-            self.timer.start(30)
-            self.ui_update_timer.start()
             self.metrics_panel.setVisible(True)
             self.auth_progress.setVisible(True)
             self.auth_manager.reset_auth_state()
+            self.last_overlay = None
+
+            # Capture and recognition run on worker threads, the GUI only draws
+            self.pipeline = CameraPipeline(self.capture, self.auth_manager)
+            self.pipeline.frame_ready.connect(self.update_frame)
+            self.pipeline.result_ready.connect(self.on_recognition_result)
+            self.pipeline.start()
+            self.ui_update_timer.start()
 
     def stop_camera(self):
         """Stop the camera feed"""
         if self.capture is not None:
-            self.timer.stop()
+            self.pipeline.stop()
+            self.pipeline = None
             self.ui_update_timer.stop()
             self.capture.release()
             self.capture = None
+            self.last_overlay = None
             self.video_label.setPixmap(self.placeholder)
-            self.start_btn.setEnabled(True)
+            self.start_btn.setEnabled(self.models_ready)
             self.metrics_panel.setVisible(False)
             self.auth_progress.setVisible(False)
             self.auth_manager.reset_auth_state()
@@ -688,17 +784,28 @@ class LoginScreen(QMainWindow):
             """)
             self.auth_progress.setValue(0)
 
-    def update_frame(self):
-        """Process and display the next camera frame"""
+    def update_frame(self, frame):
+        """Display a camera frame with the latest recognition overlay"""
         if self.capture is None:
             return
 
-        ret, frame = self.capture.read()
-        if not ret:
-            return
+        started = time.perf_counter()
+        display_frame = frame.copy()
+        if self.last_overlay is not None:
+            self.auth_manager.draw_overlay(display_frame, self.last_overlay)
 
-        # Process frame with auth manager
-        display_frame, metrics = self.auth_manager.process_frame(frame)
+        # Convert to QImage and display
+        rgb = cv2.cvtColor(display_frame, cv2.COLOR_BGR2RGB)
+        h, w, ch = rgb.shape
+        qt_img = QImage(rgb.data, w, h, ch * w, QImage.Format_RGB888)
+        self.video_label.setPixmap(QPixmap.fromImage(qt_img))
+        metrics_collector.log_stage_timings({'render': time.perf_counter() - started})
+
+    def on_recognition_result(self, overlay, metrics):
+        """Handle a result from the recognition worker"""
+        if self.capture is None:
+            return
+        self.last_overlay = overlay
 
         # Zapisz ID użytkownika, gdy weryfikacja jest zakończona
         if (self.auth_manager.auth_state == "verified" and 
@@ -718,12 +825,6 @@ class LoginScreen(QMainWindow):
         # Update metrics panel
         self.metrics_panel.update_metrics(metrics)
 
-        # Convert to QImage and display
-        rgb = cv2.cvtColor(display_frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb.shape
-        qt_img = QImage(rgb.data, w, h, ch * w, QImage.Format_RGB888)
-        self.video_label.setPixmap(QPixmap.fromImage(qt_img))
-
     def handle_authentication_result(self):
         """Handle transition to appropriate panel based on authentication result"""
         # if self.auth_manager.auth_state != "verified" or self.auth_manager.current_user_id is None:
@@ -761,6 +862,9 @@ class LoginScreen(QMainWindow):
 
     def show_admin_panel(self, username):
         """Show the admin panel"""
+        # Imported on demand - the admin panel pulls in matplotlib
+        from ui.admin_panel import AdminPanel
+
         # Create admin panel if it doesn't exist
         admin_panel = AdminPanel(username)
         admin_panel.logout_requested.connect(self.handle_logout)
@@ -792,10 +896,15 @@ class LoginScreen(QMainWindow):
 
         # Return to login page
         self.stack.setCurrentWidget(self.login_page)
-        self.start_btn.setEnabled(True)
+        self.start_btn.setEnabled(self.models_ready)
 
     def open_registration(self):
         """Open the admin registration window"""
+        if not self.models_ready:
+            self.load_models()
+            return
+        from ui.admin_registration import AdminRegistration
+
         self.hide()
         self.reg_window = AdminRegistration()
         self.reg_window.registration_complete.connect(self.on_registration_complete)
@@ -810,6 +919,12 @@ class LoginScreen(QMainWindow):
             self.reg_btn.hide()
             self.start_btn.show()
 
+    def closeEvent(self, event):
+        """Stop worker threads before the window closes"""
+        self.stop_camera()
+        self.warmup_thread.wait()
+        event.accept()
+
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
@@ -2,6 +2,7 @@ import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 import numpy as np
+from collections import deque
 from datetime import datetime, timedelta
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel,
@@ -10,6 +11,10 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QFont
 from metrics.collector import metrics_collector
+from ui.live_chart import LiveLineChart
+
+# Liczba próbek na wykresach historii (1 minuta przy odświeżaniu co sekundę)
+HISTORY_SAMPLES = 60
 
 class MetricsPanel(QWidget):
     """Panel wyświetlający metryki systemu"""
@@ -24,11 +29,10 @@ class MetricsPanel(QWidget):
         self.update_timer.start(1000)  # Odświeżaj co sekundę
 
         # Historia metryk
-        self.auth_history = []
-        self.confidence_history = []
-        self.detection_time_history = []
-        self.quality_history = []
-        self.timestamps = []
+        self.confidence_history = deque(maxlen=HISTORY_SAMPLES)
+        self.detection_time_history = deque(maxlen=HISTORY_SAMPLES)
+        self.quality_history = deque(maxlen=HISTORY_SAMPLES)
+        self.auth_counts = None
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -91,18 +95,27 @@ class MetricsPanel(QWidget):
         self.confidence_figure = Figure(figsize=(4, 3))
         self.confidence_canvas = FigureCanvas(self.confidence_figure)
         self.confidence_canvas.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.confidence_chart = LiveLineChart(self.confidence_figure, self.confidence_canvas,
+                                              'Historia pewności', 'Pewność', 'g-', ylim=(0, 1),
+                                              window=HISTORY_SAMPLES)
         charts_layout.addWidget(self.confidence_canvas, 0, 1)
 
         # Wykres czasu detekcji
         self.detection_figure = Figure(figsize=(4, 3))
         self.detection_canvas = FigureCanvas(self.detection_figure)
         self.detection_canvas.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.detection_chart = LiveLineChart(self.detection_figure, self.detection_canvas,
+                                             'Czas detekcji', 'Czas (s)', 'b-',
+                                             window=HISTORY_SAMPLES)
         charts_layout.addWidget(self.detection_canvas, 1, 0)
 
         # Wykres jakości detekcji
         self.quality_figure = Figure(figsize=(4, 3))
         self.quality_canvas = FigureCanvas(self.quality_figure)
         self.quality_canvas.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.quality_chart = LiveLineChart(self.quality_figure, self.quality_canvas,
+                                           'Jakość detekcji', 'Jakość (%)', 'r-', ylim=(0, 100),
+                                           window=HISTORY_SAMPLES)
         charts_layout.addWidget(self.quality_canvas, 1, 1)
 
         metrics_grid.addLayout(charts_layout, 1, 0, 1, 2)
@@ -137,58 +150,52 @@ class MetricsPanel(QWidget):
 
     def update_metrics(self):
         """Aktualizuje wyświetlane metryki i wykresy"""
-        # Aktualizacja etykiet
-        self.total_attempts_label.setText(str(metrics_collector.total_attempts))
-        self.successful_auths_label.setText(str(metrics_collector.successful_auths))
-        self.failed_auths_label.setText(str(metrics_collector.failed_auths))
-        
-        # Obliczanie metryk
-        avg_confidence = 0
-        if metrics_collector.confidence_scores:
-            avg_confidence = sum(score for _, score in metrics_collector.confidence_scores) / len(metrics_collector.confidence_scores)
+        # Aktualizacja etykiet - jeden niezmienny snapshot agregatów z kolektora
+        snapshot = metrics_collector.get_snapshot()
+        self.total_attempts_label.setText(str(snapshot.total_attempts))
+        self.successful_auths_label.setText(str(snapshot.successful_auths))
+        self.failed_auths_label.setText(str(snapshot.failed_auths))
+        
+        # Średnie z ostatniej godziny
+        confidence = snapshot.recent['confidence']
+        avg_confidence = confidence.mean
+        if confidence.count:
             self.avg_confidence_label.setText(f"{avg_confidence:.2%}")
         
-        avg_time = 0
-        if metrics_collector.detection_times:
-            avg_time = sum(time for _, time in metrics_collector.detection_times) / len(metrics_collector.detection_times)
-            self.avg_detection_time_label.setText(f"{avg_time:.2f}s")
+        detection_time = snapshot.recent['detection_time']
+        avg_time = detection_time.mean
+        if detection_time.count:
+            self.avg_detection_time_label.setText(f"{avg_time:.2f}s (p95 {detection_time.p95:.2f}s)")
         
-        avg_quality = 0
-        if metrics_collector.face_quality_scores:
-            avg_quality = sum(score for _, score in metrics_collector.face_quality_scores) / len(metrics_collector.face_quality_scores)
+        face_quality = snapshot.recent['face_quality']
+        avg_quality = face_quality.mean
+        if face_quality.count:
             self.face_quality_label.setText(f"{avg_quality:.0f}%")
 
         # Aktualizacja historii
-        current_time = datetime.now()
-        self.timestamps.append(current_time)
-        self.auth_history.append((metrics_collector.successful_auths, metrics_collector.failed_auths))
         self.confidence_history.append(avg_confidence)
         self.detection_time_history.append(avg_time)
         self.quality_history.append(avg_quality)
 
-        # Zachowaj tylko ostatnie 60 próbek (1 minuta przy odświeżaniu co sekundę)
-        max_samples = 60
-        if len(self.timestamps) > max_samples:
-            self.timestamps = self.timestamps[-max_samples:]
-            self.auth_history = self.auth_history[-max_samples:]
-            self.confidence_history = self.confidence_history[-max_samples:]
-            self.detection_time_history = self.detection_time_history[-max_samples:]
-            self.quality_history = self.quality_history[-max_samples:]
-
-        # Aktualizacja wykresów
-        self.update_auth_chart()
-        self.update_confidence_chart()
-        self.update_detection_chart()
-        self.update_quality_chart()
+        # Aktualizacja wykresów - pomijana, gdy panel jest niewidoczny
+        if not self.isVisible():
+            return
+        self.update_auth_chart(snapshot)
+        self.confidence_chart.update(self.confidence_history)
+        self.detection_chart.update(self.detection_time_history)
+        self.quality_chart.update(self.quality_history)
+
+    def update_auth_chart(self, snapshot):
+        """Aktualizuje wykres kołowy autoryzacji (tylko przy zmianie liczników)"""
+        success = snapshot.successful_auths
+        failed = snapshot.failed_auths
+        if (success, failed) == self.auth_counts:
+            return
+        self.auth_counts = (success, failed)
 
-    def update_auth_chart(self):
-        """Aktualizuje wykres kołowy autoryzacji"""
         self.auth_figure.clear()
         ax = self.auth_figure.add_subplot(111)
         
-        success = metrics_collector.successful_auths
-        failed = metrics_collector.failed_auths
-        
         if success + failed > 0:
             sizes = [success, failed]
             labels = ['Udane', 'Nieudane']
@@ -201,60 +208,4 @@ class MetricsPanel(QWidget):
             ax.axis('off')
         
         self.auth_figure.suptitle('Statystyki autoryzacji', fontsize=10)
-        self.auth_canvas.draw()
-
-    def update_confidence_chart(self):
-        """Aktualizuje wykres historii pewności"""
-        self.confidence_figure.clear()
-        ax = self.confidence_figure.add_subplot(111)
-        
-        if self.confidence_history:
-            ax.plot(self.timestamps, self.confidence_history, 'g-', linewidth=2)
-            ax.set_ylim(0, 1)
-            ax.set_ylabel('Pewność')
-            ax.tick_params(axis='x', rotation=45)
-            ax.grid(True, alpha=0.3)
-        else:
-            ax.text(0.5, 0.5, 'Brak danych', ha='center', va='center')
-            ax.axis('off')
-        
-        self.confidence_figure.suptitle('Historia pewności', fontsize=10)
-        self.confidence_figure.tight_layout()
-        self.confidence_canvas.draw()
-
-    def update_detection_chart(self):
-        """Aktualizuje wykres czasu detekcji"""
-        self.detection_figure.clear()
-        ax = self.detection_figure.add_subplot(111)
-        
-        if self.detection_time_history:
-            ax.plot(self.timestamps, self.detection_time_history, 'b-', linewidth=2)
-            ax.set_ylabel('Czas (s)')
-            ax.tick_params(axis='x', rotation=45)
-            ax.grid(True, alpha=0.3)
-        else:
-            ax.text(0.5, 0.5, 'Brak danych', ha='center', va='center')
-            ax.axis('off')
-        
-        self.detection_figure.suptitle('Czas detekcji', fontsize=10)
-        self.detection_figure.tight_layout()
-        self.detection_canvas.draw()
-
-    def update_quality_chart(self):
-        """Aktualizuje wykres jakości detekcji"""
-        self.quality_figure.clear()
-        ax = self.quality_figure.add_subplot(111)
-        
-        if self.quality_history:
-            ax.plot(self.timestamps, self.quality_history, 'r-', linewidth=2)
-            ax.set_ylim(0, 100)
-            ax.set_ylabel('Jakość (%)')
-            ax.tick_params(axis='x', rotation=45)
-            ax.grid(True, alpha=0.3)
-        else:
-            ax.text(0.5, 0.5, 'Brak danych', ha='center', va='center')
-            ax.axis('off')
-        
-        self.quality_figure.suptitle('Jakość detekcji', fontsize=10)
-        self.quality_figure.tight_layout()
-        self.quality_canvas.draw() 
\ No newline at end of file
+        self.auth_canvas.draw_idle()
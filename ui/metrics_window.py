@@ -2,16 +2,40 @@ import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
+from matplotlib.ticker import MaxNLocator
 import numpy as np
 from datetime import datetime, timedelta
 import os
+import time
 
 from PyQt5.QtWidgets import (QMainWindow, QVBoxLayout, QHBoxLayout,
-                             QPushButton, QWidget, QLabel, QMessageBox, QFileDialog)
+                             QPushButton, QWidget, QLabel, QMessageBox, QFileDialog, QComboBox)
 from PyQt5.QtCore import QTimer, Qt
 from PyQt5.QtGui import QFont
 
-from metrics.collector import metrics_collector
+from metrics.collector import metrics_collector, PIPELINE_STAGES
+from metrics.store import metrics_store
+
+# Fixed histogram bins so the bars can be reused between refreshes
+CONFIDENCE_BINS = np.linspace(0, 1, 21)
+
+# Accuracy chart ranges (label, hours); longer than LIVE_HOURS are read from the persistent store rollups
+ACCURACY_RANGES = [('2h', 2), ('24h', 24), ('7 dni', 7 * 24), ('30 dni', 30 * 24)]
+LIVE_HOURS = 2
+
+# Pipeline stage labels for the stage breakdown chart
+STAGE_LABELS = {
+    'capture': 'Dekodowanie klatki',
+    'gray': 'Skala szarości',
+    'detect': 'Detekcja',
+    'preprocess': 'Przygotowanie twarzy',
+    'inference': 'FaceNet',
+    'gallery': 'Galeria',
+    'matching': 'Dopasowanie',
+    'db_enqueue': 'Kolejkowanie zapisów',
+    'db': 'Zapis do bazy',
+    'render': 'Wyświetlanie',
+}
 
 
 class MetricsWindow(QMainWindow):
@@ -42,6 +66,11 @@ class MetricsWindow(QMainWindow):
         self.save_btn = QPushButton('Zapisz wykresy')
         self.save_btn.clicked.connect(self.save_charts)
 
+        self.range_combo = QComboBox()
+        for label, hours in ACCURACY_RANGES:
+            self.range_combo.addItem(f'Zakres: {label}', (label, hours))
+        self.range_combo.currentIndexChanged.connect(self.update_charts)
+
         self.close_btn = QPushButton('Zamknij')
         self.close_btn.clicked.connect(self.close)
 
@@ -62,12 +91,13 @@ class MetricsWindow(QMainWindow):
 
         btn_layout.addWidget(self.refresh_btn)
         btn_layout.addWidget(self.save_btn)
+        btn_layout.addWidget(self.range_combo)
         btn_layout.addStretch()
         btn_layout.addWidget(self.close_btn)
         layout.addLayout(btn_layout)
 
         # Create matplotlib figure
-        self.figure = Figure(figsize=(12, 8))
+        self.figure = Figure(figsize=(12, 11))
         self.canvas = FigureCanvas(self.figure)
         layout.addWidget(self.canvas)
 
@@ -83,34 +113,80 @@ class MetricsWindow(QMainWindow):
         self.timer.start(5000)  # Update every 5 seconds
 
         # Initial chart update
+        self.axes = None
         self.update_charts()
 
+    def init_charts(self):
+        """Create persistent axes and artists; later updates only change their data"""
+        self.figure.clear()
+        grid = self.figure.add_gridspec(3, 2)
+        ax1 = self.figure.add_subplot(grid[0, 0])
+        ax2 = self.figure.add_subplot(grid[0, 1])
+        ax3 = self.figure.add_subplot(grid[1, 0])
+        ax4 = self.figure.add_subplot(grid[1, 1])
+        ax5 = self.figure.add_subplot(grid[2, :])
+        self.axes = (ax1, ax2, ax3, ax4, ax5)
+
+        # 1. Accuracy over time - one line updated with set_data
+        self.accuracy_line, = ax1.plot([], [], 'b-o', markersize=4, linewidth=2)
+        self.accuracy_empty = ax1.text(0.5, 0.5, 'Brak danych', ha='center', va='center', transform=ax1.transAxes)
+        ax1.set_ylabel('Dokładność (%)')
+        ax1.set_ylim(0, 100)
+        ax1.grid(True, alpha=0.3)
+        ax1.xaxis.set_major_locator(MaxNLocator(6))
+        ax1.tick_params(axis='x', labelrotation=45)
+
+        # 2. Confidence distribution - fixed bins, bar heights updated in place
+        width = CONFIDENCE_BINS[1] - CONFIDENCE_BINS[0]
+        self.confidence_bars = ax2.bar(CONFIDENCE_BINS[:-1], np.zeros(len(CONFIDENCE_BINS) - 1), width=width,
+                                       align='edge', alpha=0.7, color='green', edgecolor='black')
+        self.confidence_empty = ax2.text(0.5, 0.5, 'Brak danych', ha='center', va='center', transform=ax2.transAxes)
+        ax2.axvline(x=0.8, color='red', linestyle='--', linewidth=2, label='Próg akceptacji')
+        ax2.set_title('Rozkład pewności (1h)', fontsize=12, fontweight='bold')
+        ax2.set_xlabel('Pewność')
+        ax2.set_ylabel('Liczba prób')
+        ax2.set_xlim(0, 1)
+        ax2.legend()
+        ax2.grid(True, alpha=0.3)
+
+        # 5. Stage breakdown - mean and p95 bars per pipeline stage, widths updated in place
+        positions = np.arange(len(PIPELINE_STAGES))
+        self.stage_p95_bars = ax5.barh(positions, np.zeros(len(positions)), height=0.8,
+                                       color='#f5b7b1', label='p95')
+        self.stage_mean_bars = ax5.barh(positions, np.zeros(len(positions)), height=0.5,
+                                        color='#73198a', label='Średnia')
+        self.stage_empty = ax5.text(0.5, 0.5, 'Brak danych', ha='center', va='center', transform=ax5.transAxes)
+        ax5.set_yticks(positions)
+        ax5.set_yticklabels([STAGE_LABELS[stage] for stage in PIPELINE_STAGES])
+        ax5.invert_yaxis()
+        ax5.set_title('Czas etapów przetwarzania klatki (1h)', fontsize=12, fontweight='bold')
+        ax5.set_xlabel('Czas (ms)')
+        ax5.set_xlim(0, 1)
+        ax5.legend(loc='lower right')
+        ax5.grid(True, axis='x', alpha=0.3)
+
+        # Data last drawn on each chart (None = never drawn)
+        self.chart_data = [None] * len(self.axes)
+
+        self.figure.tight_layout(pad=2.0, h_pad=5.0)
+
     def update_charts(self):
-        """Update all charts with latest data"""
+        """Update charts whose data changed and redraw the canvas once"""
         try:
-            self.figure.clear()
-
-            # Create subplots
-            ax1 = self.figure.add_subplot(2, 2, 1)
-            ax2 = self.figure.add_subplot(2, 2, 2)
-            ax3 = self.figure.add_subplot(2, 2, 3)
-            ax4 = self.figure.add_subplot(2, 2, 4)
-
-            # 1. Accuracy over time
-            self.plot_accuracy_over_time(ax1)
-
-            # 2. Confidence score distribution
-            self.plot_confidence_distribution(ax2)
-
-            # 3. Detection time statistics
-            self.plot_detection_times(ax3)
+            if self.axes is None:
+                self.init_charts()
 
-            # 4. Authentication success/failure pie chart
-            self.plot_auth_summary(ax4)
+            plots = (self.plot_accuracy_over_time, self.plot_confidence_distribution,
+                     self.plot_detection_times, self.plot_auth_summary, self.plot_stage_breakdown)
+            changed = False
+            for i, (plot, ax) in enumerate(zip(plots, self.axes)):
+                data = plot(ax, self.chart_data[i])
+                if data is not None:
+                    self.chart_data[i] = data
+                    changed = True
 
-            # Adjust layout and refresh
-            self.figure.tight_layout(pad=2.0)
-            self.canvas.draw()
+            if changed:
+                self.canvas.draw_idle()
 
             # Update stats
             self.update_stats_display()
@@ -119,142 +195,132 @@ class MetricsWindow(QMainWindow):
             print(f"Error updating charts: {e}")
             # Show error message on the figure
             self.figure.clear()
+            self.axes = None
             ax = self.figure.add_subplot(1, 1, 1)
             ax.text(0.5, 0.5, f'Błąd podczas aktualizacji wykresów:\n{str(e)}',
                     ha='center', va='center', transform=ax.transAxes,
                     bbox=dict(boxstyle='round', facecolor='red', alpha=0.3))
             ax.set_title('Błąd')
-            self.canvas.draw()
-
-    def plot_accuracy_over_time(self, ax):
-        """Plot accuracy over time with fixed matplotlib locator"""
-        try:
-            times, accuracies = metrics_collector.get_accuracy_over_time(hours=2)
-
-            if not times or len(times) == 0:
-                ax.text(0.5, 0.5, 'Brak danych', ha='center', va='center', transform=ax.transAxes)
-                ax.set_title('Dokładność w czasie (2h)', fontsize=12, fontweight='bold')
-                return
-
-            # Convert datetime objects to matplotlib dates
-            dates = mdates.date2num(times)
-
-            ax.plot(dates, accuracies, 'b-o', markersize=4, linewidth=2)
-            ax.set_title('Dokładność w czasie (2h)', fontsize=12, fontweight='bold')
-            ax.set_ylabel('Dokładność (%)')
-            ax.set_ylim(0, 100)
-            ax.grid(True, alpha=0.3)
-
-            # FIXED: Use MaxNLocator to limit number of ticks
-            from matplotlib.ticker import MaxNLocator
-            ax.xaxis.set_major_locator(MaxNLocator(6))
-            ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
-
-            # Rotate labels
-            for label in ax.get_xticklabels():
-                label.set_rotation(45)
-                label.set_ha('right')
-
-        except Exception as e:
-            ax.text(0.5, 0.5, f'Błąd: {str(e)}', ha='center', va='center', transform=ax.transAxes)
-            ax.set_title('Dokładność w czasie (2h)', fontsize=12, fontweight='bold')
-
-    def plot_confidence_distribution(self, ax):
+            self.canvas.draw_idle()
+
+    # Each plot_* method returns the data it drew, or None if it matches `previous`
+
+    def plot_accuracy_over_time(self, ax, previous):
+        """Plot accuracy over the selected range (live samples or stored rollups)"""
+        label, hours = self.range_combo.currentData()
+        if hours <= LIVE_HOURS:
+            interval = 300
+            times, accuracies = metrics_collector.get_accuracy_over_time(hours=hours, interval=interval)
+            dates = mdates.date2num(times) if len(times) else np.empty(0)
+        else:
+            # 'auth_success' is 1/0 per attempt, so the bucket mean is the success rate
+            since = time.time() - hours * 3600
+            interval = metrics_store.resolution_for(hours * 3600)
+            buckets, _, means, _, _ = metrics_store.rollups('auth_success', since, resolution=interval)
+            dates = mdates.date2num([datetime.fromtimestamp(t) for t in buckets]) if len(buckets) else np.empty(0)
+            accuracies = means * 100
+
+        data = (hours, tuple(dates), tuple(accuracies))
+        if data == previous:
+            return None
+
+        self.accuracy_line.set_data(dates, accuracies)
+        self.accuracy_line.set_marker('o' if len(dates) <= 200 else '')
+        self.accuracy_empty.set_visible(len(dates) == 0)
+        ax.set_title(f'Dokładność w czasie ({label})', fontsize=12, fontweight='bold')
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M' if hours <= 24 else '%d.%m'))
+        if len(dates):
+            # One-interval margin on both sides (also keeps a single interval visible)
+            pad = interval / (24 * 3600)
+            ax.set_xlim(dates[0] - pad, dates[-1] + pad)
+        return data
+
+    def plot_confidence_distribution(self, ax, previous):
         """Plot confidence score distribution"""
-        try:
-            scores = metrics_collector.get_confidence_distribution(hours=1)
-
-            if not scores or len(scores) == 0:
-                ax.text(0.5, 0.5, 'Brak danych', ha='center', va='center', transform=ax.transAxes)
-                ax.set_title('Rozkład pewności (1h)', fontsize=12, fontweight='bold')
-                return
-
-            # Create histogram
-            ax.hist(scores, bins=min(20, len(scores)), alpha=0.7, color='green', edgecolor='black')
-            ax.axvline(x=0.8, color='red', linestyle='--', linewidth=2, label='Próg akceptacji')
-            ax.set_title('Rozkład pewności (1h)', fontsize=12, fontweight='bold')
-            ax.set_xlabel('Pewność')
-            ax.set_ylabel('Liczba prób')
-            ax.legend()
-            ax.grid(True, alpha=0.3)
-
-        except Exception as e:
-            ax.text(0.5, 0.5, f'Błąd: {str(e)}', ha='center', va='center', transform=ax.transAxes)
-            ax.set_title('Rozkład pewności (1h)', fontsize=12, fontweight='bold')
-
-    def plot_detection_times(self, ax):
+        scores = metrics_collector.get_confidence_distribution(hours=1)
+        counts, _ = np.histogram(np.clip(scores, 0, 1), bins=CONFIDENCE_BINS)
+        data = tuple(counts)
+        if data == previous:
+            return None
+
+        for bar, count in zip(self.confidence_bars, counts):
+            bar.set_height(count)
+        self.confidence_empty.set_visible(len(scores) == 0)
+        ax.set_ylim(0, max(1, counts.max() * 1.1))
+        return data
+
+    def plot_detection_times(self, ax, previous):
         """Plot detection time statistics"""
-        try:
-            times = metrics_collector.get_detection_time_stats(hours=1)
-
-            if not times or len(times) == 0:
-                ax.text(0.5, 0.5, 'Brak danych', ha='center', va='center', transform=ax.transAxes)
-                ax.set_title('Czasy wykrywania (1h)', fontsize=12, fontweight='bold')
-                return
-
-            # Box plot
-            bp = ax.boxplot([times], patch_artist=True,
-                            boxprops=dict(facecolor='lightblue'),
-                            medianprops=dict(color='red', linewidth=2))
-            ax.set_title('Czasy wykrywania (1h)', fontsize=12, fontweight='bold')
-            ax.set_ylabel('Czas (s)')
-            ax.set_xticklabels(['Czas wykrywania'])
-            ax.grid(True, alpha=0.3)
-
-            # Add statistics text
-            avg_time = np.mean(times)
-            max_time = np.max(times)
-            min_time = np.min(times)
-            ax.text(0.02, 0.98, f'Średni: {avg_time:.2f}s\nMin: {min_time:.2f}s\nMax: {max_time:.2f}s',
-                    transform=ax.transAxes, verticalalignment='top',
-                    bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.8))
-
-        except Exception as e:
-            ax.text(0.5, 0.5, f'Błąd: {str(e)}', ha='center', va='center', transform=ax.transAxes)
-            ax.set_title('Czasy wykrywania (1h)', fontsize=12, fontweight='bold')
-
-    def plot_auth_summary(self, ax):
+        times = metrics_collector.get_detection_time_stats(hours=1)
+        data = times.tobytes()
+        if data == previous:
+            return None
+
+        ax.clear()
+        ax.set_title('Czasy wykrywania (1h)', fontsize=12, fontweight='bold')
+        if len(times) == 0:
+            ax.text(0.5, 0.5, 'Brak danych', ha='center', va='center', transform=ax.transAxes)
+            return data
+
+        # Box plot
+        ax.boxplot([times], patch_artist=True,
+                   boxprops=dict(facecolor='lightblue'),
+                   medianprops=dict(color='red', linewidth=2))
+        ax.set_ylabel('Czas (s)')
+        ax.set_xticklabels(['Czas wykrywania'])
+        ax.grid(True, alpha=0.3)
+
+        # Add statistics text
+        avg_time = np.mean(times)
+        max_time = np.max(times)
+        min_time = np.min(times)
+        ax.text(0.02, 0.98, f'Średni: {avg_time:.2f}s\nMin: {min_time:.2f}s\nMax: {max_time:.2f}s',
+                transform=ax.transAxes, verticalalignment='top',
+                bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.8))
+        return data
+
+    def plot_auth_summary(self, ax, previous):
         """Plot authentication success/failure summary"""
-        try:
-            stats = metrics_collector.get_current_stats()
-
-            if stats['total_attempts'] == 0:
-                ax.text(0.5, 0.5, 'Brak danych', ha='center', va='center', transform=ax.transAxes)
-                ax.set_title('Podsumowanie autoryzacji', fontsize=12, fontweight='bold')
-                return
-
-            # Pie chart
-            labels = ['Udane', 'Nieudane']
-            sizes = [stats['successful_auths'], stats['failed_auths']]
-            colors = ['#2ecc71', '#e74c3c']
-
-            # Filter out zero values
-            filtered_labels = []
-            filtered_sizes = []
-            filtered_colors = []
-
-            for i, size in enumerate(sizes):
-                if size > 0:
-                    filtered_labels.append(labels[i])
-                    filtered_sizes.append(size)
-                    filtered_colors.append(colors[i])
-
-            if filtered_sizes:
-                wedges, texts, autotexts = ax.pie(filtered_sizes, labels=filtered_labels,
-                                                  colors=filtered_colors, autopct='%1.1f%%',
-                                                  startangle=90, textprops={'fontsize': 10})
-
-                # Add center text with total
-                centre_circle = plt.Circle((0, 0), 0.50, fc='white')
-                ax.add_artist(centre_circle)
-                ax.text(0, 0, f'Łącznie\n{stats["total_attempts"]}', ha='center', va='center',
-                        fontsize=12, fontweight='bold')
-
-            ax.set_title('Podsumowanie autoryzacji', fontsize=12, fontweight='bold')
-
-        except Exception as e:
-            ax.text(0.5, 0.5, f'Błąd: {str(e)}', ha='center', va='center', transform=ax.transAxes)
-            ax.set_title('Podsumowanie autoryzacji', fontsize=12, fontweight='bold')
+        stats = metrics_collector.get_current_stats()
+        data = (stats['successful_auths'], stats['failed_auths'])
+        if data == previous:
+            return None
+
+        ax.clear()
+        ax.set_title('Podsumowanie autoryzacji', fontsize=12, fontweight='bold')
+        if stats['total_attempts'] == 0:
+            ax.text(0.5, 0.5, 'Brak danych', ha='center', va='center', transform=ax.transAxes)
+            ax.axis('off')
+            return data
+
+        # Pie chart (zero values filtered out)
+        labels = ['Udane', 'Nieudane']
+        colors = ['#2ecc71', '#e74c3c']
+        slices = [(label, size, color) for label, size, color in zip(labels, data, colors) if size > 0]
+        ax.pie([size for _, size, _ in slices], labels=[label for label, _, _ in slices],
+               colors=[color for _, _, color in slices], autopct='%1.1f%%',
+               startangle=90, textprops={'fontsize': 10})
+
+        # Add center text with total
+        centre_circle = plt.Circle((0, 0), 0.50, fc='white')
+        ax.add_artist(centre_circle)
+        ax.text(0, 0, f'Łącznie\n{stats["total_attempts"]}', ha='center', va='center',
+                fontsize=12, fontweight='bold')
+        return data
+
+    def plot_stage_breakdown(self, ax, previous):
+        """Plot mean and p95 time of each pipeline stage (where the frame budget goes)"""
+        stages = metrics_collector.get_snapshot().stages
+        data = tuple((stages[stage].mean, stages[stage].p95) for stage in PIPELINE_STAGES)
+        if data == previous:
+            return None
+
+        for mean_bar, p95_bar, (mean, p95) in zip(self.stage_mean_bars, self.stage_p95_bars, data):
+            mean_bar.set_width(mean * 1000)
+            p95_bar.set_width(p95 * 1000)
+        self.stage_empty.set_visible(not any(stages[stage].count for stage in PIPELINE_STAGES))
+        ax.set_xlim(0, max(1, max(p95 for _, p95 in data) * 1000 * 1.1))
+        return data
 
     def update_stats_display(self):
         """Update the statistics display label"""
@@ -265,8 +331,8 @@ class MetricsWindow(QMainWindow):
             recent_scores = metrics_collector.get_confidence_distribution(hours=1)
             recent_times = metrics_collector.get_detection_time_stats(hours=1)
 
-            avg_confidence = np.mean(recent_scores) if recent_scores else 0
-            avg_detection_time = np.mean(recent_times) if recent_times else 0
+            avg_confidence = np.mean(recent_scores) if len(recent_scores) else 0
+            avg_detection_time = np.mean(recent_times) if len(recent_times) else 0
 
             stats_text = f"""
             📊 Statystyki ogólne: Łączne próby: {stats['total_attempts']} | Udane: {stats['successful_auths']} | Nieudane: {stats['failed_auths']} | Dokładność: {stats['accuracy']:.1f}%
@@ -0,0 +1,30 @@
+import time
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from face_recognition.model_registry import model_registry
+
+
+class ModelWarmupThread(QThread):
+    """
+    Ładuje FaceNet w tle i wykonuje jedno próbne wnioskowanie, aby pierwsze
+    prawdziwe rozpoznanie nie płaciło za inicjalizację TensorFlow
+    """
+
+    loaded = pyqtSignal(float)  # czas ładowania w sekundach
+    failed = pyqtSignal(str)
+
+    def __init__(self, embedder):
+        super().__init__()
+        self.embedder = embedder
+
+    def run(self):
+        started = time.perf_counter()
+        try:
+            model_registry.get('facenet')
+            self.embedder.get_embeddings(np.zeros((1, 160, 160, 3), dtype=np.uint8))
+        except Exception as e:
+            print(f"Error loading models: {e}")
+            self.failed.emit(str(e))
+            return
+        self.loaded.emit(time.perf_counter() - started)
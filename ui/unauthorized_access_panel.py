@@ -1,13 +1,12 @@
-import cv2
-import numpy as np
 from datetime import datetime
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel,
     QScrollArea, QFrame, QPushButton, QGridLayout, QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox
 )
 from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QImage, QPixmap, QFont
+from PyQt5.QtGui import QPixmap, QFont
 from database.models import UserModel
+from database.snapshot_store import snapshot_store
 import os
 from notifications.notification_manager import notification_manager
 
@@ -71,7 +70,7 @@ class UnauthorizedAccessPanel(QWidget):
         events = self.user_model.get_unauthorized_attempts()
 
         # Dodaj zdarzenia do interfejsu
-        for row, (event_id, timestamp, image_bytes, confidence) in enumerate(events):
+        for row, (event_id, timestamp, image_ref, confidence) in enumerate(events):
             # Kontener na pojedyncze zdarzenie
             event_frame = QFrame()
             event_frame.setStyleSheet("""
@@ -89,27 +88,15 @@ class UnauthorizedAccessPanel(QWidget):
             dt = datetime.fromisoformat(timestamp)
             formatted_time = dt.strftime("%Y-%m-%d %H:%M:%S")
 
-            # Konwertuj obraz z BLOB na QPixmap
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            h, w = img.shape[:2]
-            
-            # Przeskaluj obraz, zachowując proporcje
-            target_height = 120
-            aspect_ratio = w / h
-            target_width = int(target_height * aspect_ratio)
-            
-            img = cv2.resize(img, (target_width, target_height))
-            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            h, w, ch = img.shape
-            qt_img = QImage(img.data, w, h, ch * w, QImage.Format_RGB888)
-            pixmap = QPixmap.fromImage(qt_img)
-
-            # Dodaj obraz
-            img_label = QLabel()
-            img_label.setPixmap(pixmap)
-            img_label.setFixedSize(target_width, target_height)
-            event_layout.addWidget(img_label)
+            # Gotowa miniatura (120 px wysokości) - bez dekodowania pełnego zdjęcia
+            thumb_bytes = snapshot_store.load_thumbnail(image_ref)
+            pixmap = QPixmap()
+            if thumb_bytes and pixmap.loadFromData(thumb_bytes):
+                # Dodaj obraz
+                img_label = QLabel()
+                img_label.setPixmap(pixmap)
+                img_label.setFixedSize(pixmap.width(), pixmap.height())
+                event_layout.addWidget(img_label)
 
             # Informacje o zdarzeniu
             info_layout = QVBoxLayout()
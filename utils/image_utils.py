@@ -7,4 +7,10 @@ def preprocess_face(face_img, size=(160, 160)):
     # 2) Resize do 160×160
     face = cv2.resize(face, size)
     # 3) Żadnej normalizacji na poziomie pikseli – zostawiamy uint8
-    return np.expand_dims(face, axis=0)  # shape = (1,160,160,3), dtype=uint8
\ No newline at end of file
+    return np.expand_dims(face, axis=0)  # shape = (1,160,160,3), dtype=uint8
+
+def preprocess_faces(face_imgs, size=(160, 160)):
+    # Paczka twarzy dla FaceEmbedder.get_embeddings - shape = (N,160,160,3), dtype=uint8
+    if not face_imgs:
+        return np.empty((0, size[1], size[0], 3), dtype=np.uint8)
+    return np.concatenate([preprocess_face(face, size) for face in face_imgs])